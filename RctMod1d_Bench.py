@@ -0,0 +1,241 @@
+"""
+1D Plasma Benchmark Module
+
+Bench_1d contains:
+    kernels: cnt_diff, cnt_diff_2nd, calc_transp_coeff, calc_ambi,
+             calc_th_flux, limit_plasma
+    one full step of all stages, not a relaxation run:
+        den_step: transport, density, b.c. and limits
+        Te_step: conductivity, heat flux, eon energy and b.c.
+        implicit (theta = 1) to be stable at any nx
+    over a range of nx and batch sizes (n_cases)
+    results saved as JSON, compared against a saved baseline
+    allocation check of the coupled explicit step, see check_alloc
+
+Usage:
+    python RctMod1d_Bench.py --out bench.json
+    python RctMod1d_Bench.py --baseline bench.json --tol 0.2
+    The exit code is 1 if a case is slower than baseline*(1 + tol).
+    python RctMod1d_Bench.py --alloc
+    The exit code is 1 if a step allocates, in a few seconds,
+    also run by test_RctMod1d_Bench.py.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+NX = [51, 501, 5001, 50001, 100001]
+BATCH = [1, 8]
+# bytes, max temporary memory of one step, a NumPy reduction (min, max)
+# holds ~1 KB of iterator state whatever nx, one profile is 8*nx bytes
+ALLOC_STEP = 2048
+
+
+def timeit(func, repeat=5, mintime=0.05):
+    """
+    Time func(), best of repeat loops of at least mintime.
+
+    output: s, time per call
+    """
+    t0 = time.perf_counter()
+    func()
+    nloop = max(int(mintime/max(time.perf_counter() - t0, 1e-9)), 1)
+    best = np.inf
+    for irep in range(repeat):
+        t0 = time.perf_counter()
+        for iloop in range(nloop):
+            func()
+        best = min(best, (time.perf_counter() - t0)/nloop)
+    return best
+
+
+def build(nx, batch):
+    """Build the modules of one case, batch = 1 runs a single case."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Eergy import Eergy_1d
+    from RctMod1d_Power import Power_1d
+    mesh1d = Mesh_1d('Bench_1d', 10e-2, nx=nx)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma(ne=1e17 if batch == 1 else np.full(batch, 1e17))
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    een1d = Eergy_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    pwr1d.calc_pwr_in(pla1d)
+    txp1d.calc_ambi(pla1d)
+    return pla1d, txp1d, src1d, een1d, pwr1d
+
+
+def bench_case(nx, batch, **kwargs):
+    """
+    Time all kernels and steps of one nx and batch size.
+
+    output: dict, name -> s per call
+    """
+    pla, txp, src, een, pwr = build(nx, batch)
+    mesh = pla.geom
+    out = np.empty_like(pla.ne)
+
+    def transp_coeff():
+        pla.touch('Te')
+        txp.calc_transp_coeff(pla)
+
+    def ambi():
+        pla.touch('Te', 'ne', 'ni')
+        txp.calc_ambi(pla)
+
+    def limit():
+        pla.touch('ne', 'ni')
+        pla.limit_plasma()
+
+    def den_step():
+        txp.calc_ambi(pla)
+        pla.den_evolve(1e-6, txp, src, theta=1.0)
+        pla.bndy_plasma()
+        pla.limit_plasma()
+
+    def Te_step():
+        een.calc_th_cond_coeff(pla)
+        een.calc_th_flux(pla, txp)
+        een.calc_Te(3e-7, pla, pwr, theta=1.0)
+        een.bndy_Te()
+
+    funcs = dict(
+        cnt_diff=lambda: mesh.cnt_diff(pla.ne, out=out),
+        cnt_diff_2nd=lambda: mesh.cnt_diff_2nd(pla.ne, out=out),
+        calc_transp_coeff=transp_coeff,
+        calc_ambi=ambi,
+        calc_th_flux=lambda: een.calc_th_flux(pla, txp),
+        limit_plasma=limit,
+        den_step=den_step,
+        Te_step=Te_step)
+    return {name: timeit(func, **kwargs) for name, func in funcs.items()}
+
+
+def check_alloc(nx=100001, batch=1, nwarm=10, nstep=100):
+    """
+    Check the coupled explicit step does not allocate.
+
+    nwarm steps first fill the caches and scratch arrays,
+    then each of nstep steps is traced by tracemalloc.
+    output: bytes, max memory allocated within a step
+    """
+    pla, txp, src, een, pwr = build(nx, batch)
+    # stable steps, those of nx = 51 scaled by dx^2
+    scale = (pla.geom.delx/2e-3)**2
+
+    def step():
+        txp.calc_ambi(pla)
+        pla.den_evolve(1e-6*scale, txp, src)
+        pla.bndy_plasma()
+        pla.limit_plasma()
+        een.calc_th_cond_coeff(pla)
+        een.calc_th_flux(pla, txp)
+        een.calc_Te(1e-7*scale, pla, pwr)
+        een.bndy_Te()
+
+    for istep in range(nwarm):
+        step()
+    tracemalloc.start()
+    try:
+        peak = 0
+        for istep in range(nstep):
+            mem = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            step()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - mem)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_bench(nxs=NX, batches=BATCH, **kwargs):
+    """
+    Run the benchmark over all nx and batch sizes.
+
+    output: dict with meta and a list of results
+    """
+    res = dict(meta=dict(python=platform.python_version(),
+                         numpy=np.__version__,
+                         machine=platform.machine(),
+                         date=time.strftime('%Y-%m-%d %H:%M:%S')),
+               results=[])
+    for batch in batches:
+        for nx in nxs:
+            for name, t in bench_case(nx, batch, **kwargs).items():
+                res['results'].append(dict(name=name, nx=nx, batch=batch,
+                                           time=t))
+                print(f'{name:18s} nx = {nx:7d} batch = {batch:3d}: '
+                      f'{t*1e6:12.2f} us, '
+                      f'{t/(nx*batch)*1e9:8.3f} ns/node')
+    return res
+
+
+def compare(res, base, tol=0.2):
+    """
+    Compare results against a baseline.
+
+    tol: allowed relative slowdown
+    output: list of (name, nx, batch, time/baseline time) over tol
+    """
+    ref = {(r['name'], r['nx'], r['batch']): r['time']
+           for r in base['results']}
+    slow = []
+    for r in res['results']:
+        key = (r['name'], r['nx'], r['batch'])
+        if key not in ref:
+            continue
+        ratio = r['time']/ref[key]
+        print(f'{key[0]:18s} nx = {key[1]:7d} batch = {key[2]:3d}: '
+              f'x{ratio:6.3f}' + ('  SLOWER' if ratio > 1.0 + tol else ''))
+        if ratio > 1.0 + tol:
+            slow.append(key + (ratio,))
+    return slow
+
+
+def main(argv=None):
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--nx', type=int, nargs='+', default=NX)
+    parser.add_argument('--batch', type=int, nargs='+', default=BATCH)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mintime', type=float, default=0.05,
+                        help='s, min time of one timing loop')
+    parser.add_argument('--out', help='save results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this JSON file')
+    parser.add_argument('--tol', type=float, default=0.2,
+                        help='allowed relative slowdown vs. baseline')
+    parser.add_argument('--alloc', action='store_true',
+                        help='only run the allocation check, see check_alloc')
+    args = parser.parse_args(argv)
+    if args.alloc:
+        nx = max(args.nx)
+        peak = check_alloc(nx)
+        print(f'nx = {nx}: {peak} bytes allocated per step, '
+              f'limit {ALLOC_STEP} bytes')
+        return 0 if peak < ALLOC_STEP else 1
+    res = run_bench(args.nx, args.batch, repeat=args.repeat,
+                    mintime=args.mintime)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(res, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        slow = compare(res, base, args.tol)
+        print(f'{len(slow)} case(s) slower than baseline by > {args.tol:.0%}')
+        return 1 if slow else 0
+    return 0
+
+
+if __name__ == '__main__':
+    """Run Bench_1d."""
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+1D Plasma Electron Boltzmann Module
+
+Boltz_1d contains:
+    two-term Boltzmann solver for the EEDF F(eps) in a DC field E/N
+        dG/deps = C_inel, G = -a*dF/deps - b*F
+        a = (E/N)^2*eps/(3*sigma_m), field heating
+        b = 2m/M*eps^2*sigma_m, elastic cooling
+        C_inel = -eps*sigma_k(eps)*F(eps) + (eps+u)*sigma_k(eps+u)*F(eps+u)
+        ionization is treated as excitation, no eon growth
+        int(eps^(1/2)*F) = 1
+    table of transport vs. E/N, run once per gas mixture
+        mean: eV, mean energy
+        muN: 1/(V*m*s), mobility * N
+        DN: 1/(m*s), diffusion coeff * N
+        loss: eV*m^3/s, energy loss coeff, power = e*ne*N*loss
+        k_<process>: m^3/s, rate coeff of each inelastic process
+    interpolation by E/N (local field) or mean energy (local energy)
+    get_table: tables held in an LRU cache keyed by the mixture
+    Input: mixture, e.g. (('Ar', 1.0),), cross sections from XSEC
+    Output: Boltz_1d table
+"""
+
+from Constants import UNIT_CHARGE, EON_MASS, AMU
+from RctMod1d_Transp import bernoulli
+
+import functools
+import numpy as np
+
+TD = 1e-21  # 1 Townsend in V*m^2
+K_MIN = 1e-300  # floor of the table, keeps log finite
+
+# cross sections, eps in eV, sigma in m^2
+# M: mass in amu
+# elastic: momentum transfer
+# inel: list of (name, threshold u in eV, eps, sigma)
+# Ar: approximate curves, Ramsauer minimum near 0.25 eV
+XSEC = {
+    'Ar': dict(
+        M=40.0,
+        elastic=(np.array([0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0,
+                           10.0, 15.0, 20.0, 50.0, 100.0, 1000.0]),
+                 1e-20*np.array([7.5, 2.7, 1.4, 0.1, 0.3, 1.4, 3.0, 7.0,
+                                 15.0, 14.0, 10.0, 6.0, 4.0, 1.0])),
+        inel=[('exc', 11.55,
+               np.array([11.55, 13.0, 15.0, 20.0, 30.0, 50.0, 100.0,
+                         1000.0]),
+               1e-20*np.array([0.0, 0.6, 0.9, 1.0, 0.9, 0.7, 0.5, 0.1])),
+              ('ion', 15.76,
+               np.array([15.76, 20.0, 30.0, 50.0, 100.0, 200.0, 1000.0]),
+               1e-20*np.array([0.0, 0.8, 1.9, 2.6, 2.9, 2.5, 1.1]))]),
+}
+
+
+class Boltz_1d(object):
+    """Define the eon transport table from the Boltzmann equation."""
+
+    def __init__(self, mix, EN_min=0.005, EN_max=1000.0, nEN=100,
+                 neps=400):
+        """
+        Solve the EEDF on a log-spaced E/N grid and build the table.
+
+        mix: tuple of (gas, mole fraction), gas in XSEC
+        EN_min, EN_max: Td, range of E/N, for Ar mean energy
+                        0.009 - 21.6 eV, i.e. Te down to the wall value
+                        (0.1 eV), lookups outside are clipped
+        nEN: number of E/N points
+        neps: number of energy cells of the EEDF
+        """
+        self.mix = tuple(mix)
+        self.neps = neps
+        self.EN = np.geomspace(EN_min, EN_max, nEN)*TD
+        self.procs = [f'{gas}_{name}' for gas, frac in self.mix
+                      for name, u, eps, sig in XSEC[gas]['inel']]
+        self.names = ['mean', 'muN', 'DN', 'loss'] + [
+            'k_' + proc for proc in self.procs]
+        self.table = {name: np.empty(nEN) for name in self.names}
+        for i, EN in enumerate(self.EN):
+            # guess the energy range, then fit it to the mean energy
+            eps_max = 100.0
+            for itn in range(2):
+                res = self.calc_coeff(EN, eps_max)
+                eps_max = max(15.0*res['mean'], 2.0)
+            for name in self.names:
+                self.table[name][i] = max(res[name], K_MIN)
+
+    def __str__(self):
+        """Print transport table."""
+        res = 'Boltz_1d:'
+        res += f'\nmix = {self.mix}'
+        res += (f'\nE/N = {self.EN[0]/TD} - {self.EN[-1]/TD} Td, '
+                f'{len(self.EN)} points')
+        res += (f'\nmean energy = {self.table["mean"][0]:.3f} - '
+                f'{self.table["mean"][-1]:.3f} eV')
+        return res
+
+    def calc_xsec(self, eps):
+        """Calc mixture sigma_m, elastic b/eps^2 and inelastic xsec."""
+        sigm = np.zeros_like(eps)
+        elas = np.zeros_like(eps)
+        inel = []
+        for gas, frac in self.mix:
+            data = XSEC[gas]
+            sig = np.interp(eps, *data['elastic'])
+            sigm += frac*sig
+            elas += frac*2.0*EON_MASS/(data['M']*AMU)*sig
+            for name, u, e, s in data['inel']:
+                inel.append((u, frac*np.interp(eps, e, s, left=0.0,
+                                               right=s[-1])))
+        return sigm, elas, inel
+
+    def solve_eedf(self, EN, eps_max):
+        """
+        Solve the EEDF.
+
+        EN: V*m^2, E/N
+        eps_max: eV, upper end of the energy grid
+        output: eps (cell centers), F, faces, dF/deps at faces,
+                and the cross sections at cells and faces
+        """
+        n = self.neps
+        h = eps_max/n
+        eps = (np.arange(n) + 0.5)*h
+        epsf = np.arange(1, n)*h  # interior faces
+        sigm, elas, inel = self.calc_xsec(eps)
+        sigmf, elasf, _ = self.calc_xsec(epsf)
+        a = EN**2*epsf/(3.0*sigmf)
+        b = elasf*epsf**2
+        # exponential fitting of G = -a*dF/deps - b*F, as in Transp_1d
+        pe = -b*h/a
+        c, d = a/h*bernoulli(-pe), a/h*bernoulli(pe)
+        # G at face j+1/2 = c*F[j] - d*F[j+1], G = 0 at both ends
+        mat = np.zeros((n, n))
+        idx = np.arange(n - 1)
+        mat[idx, idx] += c/h
+        mat[idx, idx + 1] -= d/h
+        mat[idx + 1, idx] -= c/h
+        mat[idx + 1, idx + 1] += d/h
+        # inelastic loss at eps, gain at eps - u
+        for u, sig in inel:
+            loss = eps*sig
+            mat[np.arange(n), np.arange(n)] += loss
+            s = int(round(u/h))
+            if s < n:
+                jdx = np.arange(s, n)
+                mat[jdx - s, jdx] -= loss[jdx]
+        # number conservation makes mat singular, normalize instead
+        mat[-1] = np.sqrt(eps)*h
+        rhs = np.zeros(n)
+        rhs[-1] = 1.0
+        F = np.maximum(np.linalg.solve(mat, rhs), 0.0)
+        dF = np.diff(F)/h
+        return eps, F, epsf, dF, sigm, elas, inel, sigmf
+
+    def calc_coeff(self, EN, eps_max):
+        """Calc mean energy, transport and rate coeffs at one E/N."""
+        eps, F, epsf, dF, sigm, elas, inel, sigmf = self.solve_eedf(
+            EN, eps_max)
+        h = eps[1] - eps[0]
+        gamma = np.sqrt(2.0*UNIT_CHARGE/EON_MASS)
+        res = dict(mean=np.sum(eps**1.5*F)*h)
+        res['muN'] = -gamma/3.0*np.sum(epsf/sigmf*dF)*h
+        res['DN'] = gamma/3.0*np.sum(eps/sigm*F)*h
+        res['loss'] = gamma*np.sum(elas*eps**2*F)*h
+        for proc, (u, sig) in zip(self.procs, inel):
+            k = gamma*np.sum(eps*sig*F)*h
+            res['k_' + proc] = k
+            res['loss'] += k*u
+        return res
+
+    def calc(self, name, val, by='mean', out=None):
+        """
+        Interpolate one table column.
+
+        name: column, see module doc
+        val: mean energy in eV (by='mean') or E/N in V*m^2 (by='EN')
+             any shape, clipped to the table range
+        out: optional array to write the result into
+        """
+        x = self.table['mean'] if by == 'mean' else self.EN
+        res = np.interp(np.log(np.clip(val, x[0], x[-1])), np.log(x),
+                        np.log(self.table[name]))
+        if out is None:
+            return np.exp(res)
+        return np.exp(res, out=out)
+
+
+@functools.lru_cache(maxsize=8)
+def get_table(mix=(('Ar', 1.0),), **kwargs):
+    """
+    Return the transport table of a mixture, built once and cached.
+
+    mix: tuple of (gas, mole fraction), must be hashable
+    kwargs: grid options, see Boltz_1d
+    """
+    return Boltz_1d(mix, **kwargs)
+
+
+if __name__ == '__main__':
+    """Test Boltz_1d."""
+    import time
+    t0 = time.perf_counter()
+    tab = get_table((('Ar', 1.0),))
+    t1 = time.perf_counter()
+    tab = get_table((('Ar', 1.0),))
+    t2 = time.perf_counter()
+    print(tab)
+    print(f'build {t1 - t0:.3e} s, cached {t2 - t1:.3e} s')
+    for EN in (10.0, 30.0, 100.0, 300.0):
+        print(f'E/N = {EN:5.0f} Td: '
+              + ', '.join(f'{name} = {tab.calc(name, EN*TD, by="EN"):.3e}'
+                          for name in tab.names))
+    # generalized Einstein relation, DN/muN ~ 2/3*mean energy
+    ratio = tab.table['DN']/tab.table['muN']/(tab.table['mean']/1.5)
+    print(f'DN/muN/(2/3*mean) = {ratio.min():.3f} - {ratio.max():.3f}')
+    print('mean energy increasing with E/N:',
+          bool(np.all(np.diff(tab.table['mean']) > 0.0)))
+    # energy loss in the Te equation, 1 kW/m^3
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Eergy import Eergy_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d, table=tab)
+    txp1d.calc_ambi(pla1d)
+    pwr1d = Power_1d(pla1d)
+    pwr1d.calc_pwr_in(pla1d, 1e3)
+    for table in (None, tab):
+        een1d = Eergy_1d(pla1d, table=table)
+        for itn in range(3000):
+            een1d.calc_th_cond_coeff(pla1d)
+            een1d.calc_th_flux(pla1d, txp1d)
+            een1d.calc_Te(1e-5, pla1d, pwr1d, theta=1.0)
+            een1d.bndy_Te()
+        print(f"{'without' if table is None else 'with'} loss: "
+              f'Te max = {een1d.Te.max():.3f} eV, '
+              f'loss max = {een1d.loss.max():.3e} W/m^3')
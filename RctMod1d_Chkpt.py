@@ -0,0 +1,221 @@
+"""
+1D Plasma Checkpoint Module
+
+Chkpt_1d contains:
+    save the state of Plasma_1d, Transp_1d, Eergy_1d, Power_1d, ...
+        every N steps or every N seconds of wall time
+    one directory per checkpoint, ckpt_<step>/
+        <obj>.<attr>.npy for each array attribute, except views of
+            another one (e.g. Plasma_1d ne, ni, ... of pla.state)
+            and scratch buffers (SCRATCH)
+        meta.json for step, time and scalar attributes
+        written to ckpt_<step>.tmp/ and renamed once complete,
+            tmp dirs left by a crash are removed on init
+    restart from a checkpoint
+    memory-mapped reads of one or all checkpoints
+"""
+
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+# scratch buffers, not saved
+SCRATCH = ('work',)
+
+
+class Chkpt_1d(object):
+    """Define the checkpoint store."""
+
+    def __init__(self, path, every=None, wall=None, keep=None):
+        """
+        Init the checkpoint store.
+
+        path: directory of the store
+        every: save every N steps
+        wall: s, save every N seconds of wall time
+        keep: number of checkpoints to keep, default all
+        One writer per store, unfinished checkpoints are removed.
+        """
+        self.path = path
+        self.every, self.wall, self.keep = every, wall, keep
+        self.last = time.time()
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            if name.startswith('ckpt_') and name.endswith('.tmp'):
+                shutil.rmtree(os.path.join(self.path, name),
+                              ignore_errors=True)
+
+    def __str__(self):
+        """Print checkpoint store."""
+        res = 'Chkpt_1d:'
+        res += f'\npath = {self.path}'
+        res += f'\ncheckpoints = {len(self.list())}'
+        return res
+
+    def list(self):
+        """Return the checkpoint dirs, oldest first."""
+        return sorted(os.path.join(self.path, name)
+                      for name in os.listdir(self.path)
+                      if name.startswith('ckpt_') and
+                      not name.endswith('.tmp'))
+
+    def latest(self):
+        """Return the newest checkpoint dir, None if there is none."""
+        ckpts = self.list()
+        return ckpts[-1] if ckpts else None
+
+    def maybe_save(self, itn, t, **objs):
+        """Save if N steps or N seconds have passed, see save."""
+        due = self.every and not itn % self.every
+        due = due or (self.wall and time.time() - self.last >= self.wall)
+        if due:
+            self.save(itn, t, **objs)
+        return bool(due)
+
+    def save(self, itn, t, **objs):
+        """
+        Save a checkpoint.
+
+        itn: step number
+        t: s, time
+        objs: name=object, e.g. pla=pla1d, txp=txp1d
+              array attributes go to .npy, scalars to meta.json,
+              views, scratch and other attributes (e.g. geom)
+              are skipped
+        output: checkpoint dir
+        """
+        ckpt = os.path.join(self.path, f'ckpt_{itn:09d}')
+        tmp = ckpt + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        meta = dict(itn=itn, t=t, scalars={})
+        for name, obj in objs.items():
+            arrays = [val for val in vars(obj).values()
+                      if isinstance(val, np.ndarray)]
+            for attr, val in vars(obj).items():
+                if isinstance(val, np.ndarray):
+                    if attr in SCRATCH or any(val.base is other
+                                              for other in arrays):
+                        continue
+                    np.save(os.path.join(tmp, f'{name}.{attr}.npy'), val)
+                elif isinstance(val, (int, float, str, np.number)):
+                    meta['scalars'][f'{name}.{attr}'] = (
+                        val.item() if isinstance(val, np.number) else val)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+        # a checkpoint appears only once it is complete
+        shutil.rmtree(ckpt, ignore_errors=True)
+        os.replace(tmp, ckpt)
+        self.last = time.time()
+        if self.keep:
+            for old in self.list()[:-self.keep]:
+                shutil.rmtree(old)
+        return ckpt
+
+    def load(self, ckpt=None, mmap=True):
+        """
+        Load a checkpoint.
+
+        ckpt: checkpoint dir, default latest
+        mmap: memory-map the arrays instead of reading them
+        output: meta dict, dict of 'obj.attr': array,
+                None if ckpt is not given and there is no checkpoint
+        """
+        ckpt = ckpt or self.latest()
+        if ckpt is None:
+            return None
+        with open(os.path.join(ckpt, 'meta.json')) as f:
+            meta = json.load(f)
+        data = {}
+        for fname in os.listdir(ckpt):
+            if fname.endswith('.npy'):
+                data[fname[:-4]] = np.load(os.path.join(ckpt, fname),
+                                           mmap_mode='r' if mmap else None)
+        return meta, data
+
+    def restore(self, ckpt=None, **objs):
+        """
+        Restart from a checkpoint.
+
+        ckpt: checkpoint dir, default latest
+        objs: name=object, as passed to save
+        Arrays of matching shape are written in place, views are
+        rebound by obj.bind_state(), see Plasma_1d.
+        output: step number, time,
+                None if there is nothing to restore (fresh start)
+        """
+        res = self.load(ckpt, mmap=False)
+        if res is None:
+            return None
+        meta, data = res
+        for key, val in list(data.items()) + list(meta['scalars'].items()):
+            name, attr = key.split('.', 1)
+            if name not in objs:
+                continue
+            obj = objs[name]
+            old = getattr(obj, attr, None)
+            if (isinstance(old, np.ndarray) and isinstance(val, np.ndarray)
+                    and old.shape == val.shape):
+                old[...] = val
+            else:
+                setattr(obj, attr, val)
+        for obj in objs.values():
+            if hasattr(obj, 'bind_state'):
+                obj.bind_state()
+            # invalidate results cached on the old state
+            if hasattr(obj, 'touch'):
+                obj.touch()
+        return meta['itn'], meta['t']
+
+    def history(self, key):
+        """
+        Read one array over all checkpoints without loading them.
+
+        key: 'obj.attr' of a saved array, e.g. 'pla.state'
+        output: list of (step, time, memory-mapped array)
+        """
+        res = []
+        for ckpt in self.list():
+            fname = os.path.join(ckpt, f'{key}.npy')
+            if not os.path.exists(fname):
+                continue
+            with open(os.path.join(ckpt, 'meta.json')) as f:
+                meta = json.load(f)
+            res.append((meta['itn'], meta['t'],
+                        np.load(fname, mmap_mode='r')))
+        return res
+
+
+if __name__ == '__main__':
+    """Test Chkpt_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    chk = Chkpt_1d('chkpt_test', every=500, keep=4)
+    dt = 1e-6
+    itn0, t = 0, 0.0
+    res = chk.restore(pla=pla1d, txp=txp1d)
+    if res is None:
+        print('nothing to restore, fresh start')
+    else:
+        itn0, t = res
+        print(f'restart from step {itn0}, t = {t} s')
+    for itn in range(itn0 + 1, 3001):
+        txp1d.calc_ambi(pla1d)
+        pla1d.den_evolve(dt, txp1d, src1d)
+        pla1d.bndy_plasma()
+        pla1d.limit_plasma()
+        t += dt
+        chk.maybe_save(itn, t, pla=pla1d, txp=txp1d)
+    print(chk)
+    # ne is state[0], see Plasma_1d.init_plasma
+    for itn, t, state in chk.history('pla.state'):
+        print(itn, t, state[0].max())
@@ -0,0 +1,167 @@
+"""
+1D Plasma Convergence Monitor Module
+
+Conv_1d contains:
+    residuals of a run, checked every N steps
+        change rate of ne, ni, Te
+            res = max|y - y_prev|/max|y|/(t - t_prev), 1/s
+        particle balance, int(se) vs. eon flux out of the walls
+            err = |int(se) - (fluxe[-2] - fluxe[1])|/scale
+        energy balance, int(Power_in - loss) vs. Qe out of the walls
+            err = |int(pwr - loss) - (Qe[-2] - Qe[1])|/scale
+        taken between the first interior nodes, the wall nodes hold b.c.
+        Without sources, or with the non-conservative convection term
+        of Eergy_1d, the balances do not close, so they are optional.
+    convergence once all residuals are below tolerance
+        for ncheck checks in a row
+    residual history, self.hist
+    Input: Plasma_1d, Transp_1d, React_1d, Eergy_1d, Power_1d
+    Output: True when converged, to stop the run
+"""
+
+import logging
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+TINY = 1e-300
+
+
+def integ(y, x):
+    """Integrate y over the mesh, along the last axis."""
+    return np.trapezoid(y, x, axis=-1)
+
+
+class Conv_1d(object):
+    """Define the convergence monitor."""
+
+    def __init__(self, tol=1.0, tol_cons=None, every=100, ncheck=3):
+        """
+        Init the convergence monitor.
+
+        tol: 1/s, tolerance of the change rate of ne, ni, Te
+        tol_cons: tolerance of the particle and energy balance,
+                  None - balance is tracked but not required
+        every: check every N steps, see check
+        ncheck: number of checks in a row below tolerance
+        """
+        self.tol, self.tol_cons = tol, tol_cons
+        self.every, self.ncheck = every, ncheck
+        self.prev = {}  # name -> copy of the variable at the last check
+        self.t_prev = None
+        self.nstep, self.nconv = 0, 0
+        self.converged = False
+        self.hist = dict(t=[])
+
+    def __str__(self):
+        """Print the monitor and the last residuals."""
+        res = 'Conv_1d:'
+        res += f'\nconverged = {self.converged}'
+        if self.hist['t']:
+            res += f", t = {self.hist['t'][-1]} s"
+        for name, val in self.hist.items():
+            if name != 't' and val:
+                res += f'\n{name} = {val[-1]:.3e}'
+        return res
+
+    def record(self, name, val):
+        """Append one residual to the history."""
+        self.hist.setdefault(name, []).append(float(val))
+        return val
+
+    def calc_rate(self, name, y, dt):
+        """Calc the change rate of y since the last check."""
+        y0 = self.prev.get(name)
+        if y0 is None:
+            self.prev[name] = y.copy()
+            return np.inf
+        res = np.max(np.abs(y - y0))/max(np.max(np.abs(y)), TINY)/dt
+        np.copyto(y0, y)
+        return self.record('d' + name, res)
+
+    def calc_balance(self, name, src, flux, x):
+        """Calc the balance error of a source against the wall flux."""
+        gain = integ(src[..., 1:-1], x[1:-1])
+        loss = flux[..., -2] - flux[..., 1]
+        scale = np.maximum(np.abs(gain),
+                           np.abs(flux[..., -2]) + np.abs(flux[..., 1]))
+        err = np.max(np.abs(gain - loss)/np.maximum(scale, TINY))
+        return self.record(name, err)
+
+    def check(self, t, pla, txp=None, src=None, een=None, pwr=None):
+        """
+        Check the residuals, every N calls.
+
+        t: s, time of the solution
+        Te is taken from een if given, else from pla.
+        The balances need txp, src (particles) and een, pwr (energy).
+        output: True once converged
+        """
+        self.nstep += 1
+        if self.nstep % self.every:
+            return self.converged
+        if self.t_prev is None:
+            self.t_prev = t
+            for name, y in self.tracked(pla, een):
+                self.calc_rate(name, y, 1.0)
+            return False
+        dt, self.t_prev = t - self.t_prev, t
+        self.hist['t'].append(t)
+        ok = True
+        for name, y in self.tracked(pla, een):
+            ok &= bool(self.calc_rate(name, y, dt) < self.tol)
+        x = pla.geom.x
+        errs = []
+        if txp is not None and src is not None:
+            errs.append(self.calc_balance('particle', src.se, txp.fluxe, x))
+        if een is not None and pwr is not None:
+            errs.append(self.calc_balance('energy', pwr.input - een.loss,
+                                            een.Qe, x))
+        if self.tol_cons is not None:
+            ok &= all(err < self.tol_cons for err in errs)
+        self.nconv = self.nconv + 1 if ok else 0
+        if self.nconv >= self.ncheck and not self.converged:
+            self.converged = True
+            log.info('converged at t = %.3e s, step %d', t, self.nstep)
+        return self.converged
+
+    def tracked(self, pla, een):
+        """Return the (name, array) pairs of the change rate."""
+        return (('ne', pla.ne), ('ni', pla.ni),
+                ('Te', pla.Te if een is None else een.Te))
+
+
+if __name__ == '__main__':
+    """Test Conv_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Eergy import Eergy_1d
+    logging.basicConfig(level=logging.INFO)
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    for itn in range(3000):
+        txp1d.calc_ambi(pla1d)
+        pla1d.den_evolve(1e-6, txp1d, src1d)
+        pla1d.bndy_plasma()
+        pla1d.limit_plasma()
+    # eon energy, up to 100000 steps
+    een1d = Eergy_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    pwr1d.calc_pwr_in(pla1d)
+    conv = Conv_1d(tol=1.0, every=1000)
+    dt = 3e-7
+    for itn in range(100000):
+        een1d.calc_th_cond_coeff(pla1d)
+        een1d.calc_th_flux(pla1d, txp1d)
+        een1d.calc_Te(dt, pla1d, pwr1d)
+        een1d.bndy_Te()
+        if conv.check(dt*(itn + 1), pla1d, txp1d, een=een1d, pwr=pwr1d):
+            break
+    print(f'stopped after {itn + 1} steps')
+    print(conv)
@@ -4,33 +4,44 @@
 Eergy_1d contains:
     Electron energy equation
     d(3/2nekTe)/dt = -dQ/dx + Power_in(ext.) - Power_loss(react)
+    Power_loss from the energy loss coeff of a Boltz_1d table,
+        zero without a table
     Input: ne, Te from Plasma1d, E_ext from field solver
     Output: Te
 """
 
-from Constants import KB_EV, EON_MASS, UNIT_CHARGE
+from Constants import KB_EV, UNIT_CHARGE
 
 import numpy as np
-import matplotlib.pyplot as plt
-from copy import deepcopy
 
 
 class Eergy_1d(object):
     """Define the eon energy module/object."""
     
-    def __init__(self, pla):
-        """Import Plasma1d information."""
-        nx = pla.geom.nx
-        self.Qe = np.zeros(nx)  # initial eon flux
-        self.dQe = np.zeros(nx)  # initial eon flux
-        self.Te = deepcopy(pla.Te)
+    def __init__(self, pla, table=None):
+        """
+        Import Plasma1d information.
+
+        All arrays are preallocated with the shape of pla.ne
+        and updated in place.
+        table: Boltz_1d eon transport table, see RctMod1d_Boltz
+               None - no collisional power loss
+        """
+        self.table = table
+        self.Qe = np.zeros_like(pla.ne)  # initial eon flux
+        self.dQe = np.zeros_like(pla.ne)  # initial eon flux
+        self.dTe = np.zeros_like(pla.ne)
+        self.d2Te = np.zeros_like(pla.ne)
+        self.th_cond_e = np.zeros_like(pla.ne)
+        self.work = np.zeros_like(pla.ne)  # scratch
+        self.loss = np.zeros_like(pla.ne)  # W/m^3, collisional power loss
+        self.Te = pla.Te.copy()
         # eon energy = 3/2 * ne * kTe
         self.ergy_e = 1.5*KB_EV*np.multiply(pla.ne, pla.Te)
-        
-        
+
     def __str__(self):
         """Print eon energy module."""
-        return f'label = {self.qdfluxe}'
+        return f'label = {self.Te}'
     
     def calc_th_cond_coeff(self, pla):
         """
@@ -41,7 +52,7 @@ class Eergy_1d(object):
         heat_cond_e: W/m/K, heat conductivity for eon
         """
         # calc thermal conductivity for eon
-        self.th_cond_e = np.ones_like(pla.ne)*1e-3
+        self.th_cond_e.fill(1e-3)
     
     def calc_th_flux(self, pla, txp):
         """
@@ -51,50 +62,98 @@ class Eergy_1d(object):
         dQe = 5/2kTe * dfluxe - ke * d2Te/dx2
         """
         # calc convection term
-        self.Qe = 2.5*KB_EV*np.multiply(self.Te, txp.fluxe)
-        self.dQe = 2.5*KB_EV*np.multiply(self.Te, txp.dfluxe)
+        np.multiply(self.Te, txp.fluxe, out=self.Qe)
+        self.Qe *= 2.5*KB_EV
+        np.multiply(self.Te, txp.dfluxe, out=self.dQe)
+        self.dQe *= 2.5*KB_EV
         # calc conduction term
-        self.dTe = pla.geom.cnt_diff(self.Te)
-        self.d2Te = pla.geom.cnt_diff_2nd(self.Te)
-        self.Qe -= np.multiply(self.th_cond_e, self.dTe)
-        self.dQe -= np.multiply(self.th_cond_e, self.d2Te)
-        
-    def calc_Te(self, delt, pla, pwr):
-        """Calc Te"""
-        self.ergy_e += (-self.dQe + pwr.input)*delt
-        self.Te = np.divide(self.ergy_e, pla.ne)/1.5/KB_EV
+        pla.geom.cnt_diff(self.Te, out=self.dTe)
+        pla.geom.cnt_diff_2nd(self.Te, out=self.d2Te)
+        np.multiply(self.th_cond_e, self.dTe, out=self.work)
+        self.Qe -= self.work
+        np.multiply(self.th_cond_e, self.d2Te, out=self.work)
+        self.dQe -= self.work
+        if self.table is not None:
+            self.calc_loss(pla)
+
+    def calc_loss(self, pla):
+        """
+        Calc the collisional power loss from the table.
+
+        loss = e*ne*N*loss(3/2*Te), W/m^3
+        N: 1/m^3, gas density from the pressure, as in init_plasma
+        Below the table, loss is scaled by the mean energy,
+        so it vanishes with Te.
+        """
+        np.multiply(self.Te, 1.5, out=self.work)
+        self.table.calc('loss', self.work, 'mean', out=self.loss)
+        mean_min = self.table.table['mean'][0]
+        np.minimum(self.work, mean_min, out=self.work)
+        self.work /= mean_min
+        self.loss *= self.work
+        self.loss *= pla.ne
+        self.loss *= UNIT_CHARGE*3.3e19*pla.press
         
+    def calc_Te(self, delt, pla, pwr, theta=0.0, active=None):
+        """
+        Calc Te.
+
+        d(3/2nekTe)/dt = -dQe + Power_in - loss
+        theta: implicitness of the conduction term ke * d2Te/dx2
+               0.0 - explicit (forward Euler)
+               0.5 - Crank-Nicolson
+               1.0 - implicit (backward Euler)
+        For theta > 0, Te(t+dt) is found by a tridiagonal solve
+        with ne frozen over the step and boundary Te kept.
+        active: bool array of n_cases in batch mode,
+                only active (not converged) cases are updated
+        """
+        if active is not None:
+            active = np.asarray(active)[..., np.newaxis]
+        if not theta:
+            # explicit update in place, using the scratch array
+            np.subtract(pwr.input, self.dQe, out=self.work)
+            if self.table is not None:
+                self.work -= self.loss
+            self.work *= delt
+            if active is not None:
+                self.work *= active
+            self.ergy_e += self.work
+            np.divide(self.ergy_e, pla.ne, out=self.work)
+            self.work /= 1.5*KB_EV
+            np.copyto(self.Te, self.work,
+                      where=True if active is None else active)
+            return
+        c = 1.5*KB_EV*pla.ne
+        coef = theta*delt*self.th_cond_e
+        rhs = self.ergy_e + (-self.dQe + pwr.input - self.loss)*delt
+        rhs -= coef*self.d2Te
+        rhs[..., 0] = c[..., 0]*self.Te[..., 0]
+        rhs[..., -1] = c[..., -1]*self.Te[..., -1]
+        Te = pla.geom.solve_diff(c, coef, rhs)
+        where = True if active is None else active
+        np.copyto(self.ergy_e, c*Te, where=where)
+        np.copyto(self.Te, Te, where=where)
+
+
     def bndy_Te(self):
         """Impose b.c. on Te."""
-        self.Te[0], self.Te[-1] = 0.1, 0.1
+        self.Te[..., 0], self.Te[..., -1] = 0.1, 0.1
         
     def plot_Te(self, pla):
-        """
-        Plot eon temperature.
-        
-        pla: Plasma_1d object
-            use pla.geom.x for plot
-        """
-        x = pla.geom.x
-        fig, axes = plt.subplots(1, 2, figsize=(8, 4),
-                                 constrained_layout=True)
-        # plot eon temperature
-        ax = axes[0]
-        ax.plot(x, self.Te, 'bo-')
-        ax.legend(['e Temperature'])
-        #
-        ax = axes[1]
-        ax.plot(x, self.Te, 'bo-')
-        ax.legend(['e Temperature'])
-        plt.show()
-        
+        """Plot eon temperature."""
+        from RctMod1d_Plot import plot_Te
+        plot_Te(self, pla)
+
+
 if __name__ == '__main__':
     """Test Eergy_1d."""
-    from Mesh import Mesh_1d
-    from Plasma1d import Plasma_1d
-    from Transp1d import Ambi_1d
-    from React1d import React_1d
-    from Power1d import Power_1d
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Render import Render_1d
     mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
     print(mesh1d)
     pla1d = Plasma_1d(mesh1d)
@@ -129,11 +188,12 @@ if __name__ == '__main__':
     pwr1d = Power_1d(pla1d)
     pwr1d.calc_pwr_in(pla1d)
     een1d.plot_Te(pla1d)
+    ren = Render_1d(prefix='Te_evolution')
     for itn in range(niter):
         een1d.calc_th_cond_coeff(pla1d)
         een1d.calc_th_flux(pla1d, txp1d)
         een1d.calc_Te(dt, pla1d, pwr1d)
         een1d.bndy_Te()
         if not (itn+1) % (niter/10):
-            een1d.plot_Te(pla1d)
-            
\ No newline at end of file
+            ren.submit(itn+1, dt*(itn+1), pla1d.geom.x, Te=een1d.Te)
+    ren.close()
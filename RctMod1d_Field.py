@@ -0,0 +1,89 @@
+"""
+1D Plasma Field Module
+
+Poisson_1d contains:
+    Poisson equation for the potential
+    d2phi/dx2 = -e*(ni - ne)/eps0
+    phi[0], phi[-1] = phi_l, phi_r (Dirichlet)
+    E = -dphi/dx
+    The mesh operator is in flux form, (g[i+1/2] - g[i-1/2])*2/(hm + hp),
+    g = dphi/dx on the cells, so it is integrated exactly by two
+    cumulative sums, O(nx), the slope at the left wall set by phi_r.
+    Input: ne, ni from Plasma_1d
+    Output: pot, ef in Plasma_1d
+"""
+
+from Constants import UNIT_CHARGE, EPS0
+from RctMod1d_Mesh import bndy_one_side
+
+import numpy as np
+
+
+class Poisson_1d(object):
+    """Define the Poisson field solver."""
+
+    def __init__(self, pla, phi_l=0.0, phi_r=0.0):
+        """
+        Init the solver on the mesh of pla.
+
+        phi_l, phi_r: V, potential at the left and right wall
+        """
+        geom = pla.geom
+        self.dx = geom.dx
+        # half width of the control volume of the interior nodes
+        self.hs2 = 0.5*(geom.dx[:-1] + geom.dx[1:])
+        # position over width, for the linear part of phi
+        self.xr = (geom.x - geom.x[0])/(geom.x[-1] - geom.x[0])
+        self.work = np.empty_like(pla.ne)
+        self.phi_l, self.phi_r = phi_l, phi_r
+
+    def __str__(self):
+        """Print field solver."""
+        return f'Poisson_1d: phi = {self.phi_l}, {self.phi_r} V'
+
+    def calc_pot(self, pla):
+        """
+        Solve the potential and E-field.
+
+        Updates pla.pot and pla.ef, calls pla.init_pot if needed.
+        """
+        if not hasattr(pla, 'pot'):
+            pla.init_pot()
+        work, pot = self.work, pla.pot
+        np.subtract(pla.ne, pla.ni, out=work)
+        work *= UNIT_CHARGE/EPS0
+        # jump of g over each interior control volume, summed up:
+        # g[j+1/2] - g[1/2], j = 0 .. nx-2, in work[..., :-1]
+        work[..., 1:-1] *= self.hs2
+        work[..., 0] = 0.0
+        np.cumsum(work[..., :-1], axis=-1, out=work[..., :-1])
+        # phi - phi_l for g[1/2] = 0
+        work[..., :-1] *= self.dx
+        pot[..., 0] = 0.0
+        np.cumsum(work[..., :-1], axis=-1, out=pot[..., 1:])
+        # add the linear part meeting phi_r
+        np.multiply(self.phi_r - self.phi_l - pot[..., -1:], self.xr,
+                    out=work)
+        pot += work
+        pot += self.phi_l
+        # E = -dphi/dx, one-sided at the walls
+        pla.geom.cnt_diff(pla.pot, out=pla.ef)
+        bndy_one_side(pla.ef, pla.pot, pla.geom)
+        np.negative(pla.ef, out=pla.ef)
+
+
+if __name__ == '__main__':
+    """Test Poisson_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=1001)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    pla1d.ni[...] = pla1d.ne + 1e10
+    fld1d = Poisson_1d(pla1d)
+    fld1d.calc_pot(pla1d)
+    # uniform charge: phi = e*dn/(2*eps0)*x*(L - x)
+    x = mesh1d.x
+    pot = UNIT_CHARGE*1e10/2.0/EPS0*x*(mesh1d.width - x)
+    print('max potential error:', np.max(np.abs(pla1d.pot - pot)))
+    pla1d.plot_pot()
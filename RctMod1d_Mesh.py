@@ -4,23 +4,198 @@ Define Mesh.
 Mesh --> 1d or 2d.
 Mesh contains:
     x position
+    uniform or stretched (geometric clustering at the walls) nodes
+    non-uniform central differencing, uniform nodes take a fast path
+        d1: 2nd order in the local spacing on any mesh
+        d2: 2nd order on a uniform mesh, 1st order on a stretched one
+    error-indicator driven refinement/coarsening, see Mesh_1d.adapt
 """
 
-from Geometry import Geom_1d
+from RctMod1d_Geom import Geom_1d
 
 import numpy as np
-import matplotlib.pyplot as plt
-from copy import deepcopy
+
+TINY = 1e-300
+
+
+def bndy_copy(dy, y, mesh):
+    """Boundary closure: copy the nearest interior value, dy[0] = dy[1]."""
+    dy[..., 0], dy[..., -1] = dy[..., 1], dy[..., -2]
+
+
+def bndy_zero(dy, y, mesh):
+    """Boundary closure: set the boundary derivative to zero."""
+    dy[..., 0], dy[..., -1] = 0.0, 0.0
+
+
+def bndy_one_side(dy, y, mesh):
+    """
+    Boundary closure: 2nd order one-sided difference for dy/dx.
+
+    dy[0] = (-3*y[0] + 4*y[1] - y[2])/(2*dx) on a uniform mesh,
+    weights from mesh.d1_l, d1_r in general.
+    Only valid for the 1st derivative.
+    """
+    (a0, a1, a2), (b0, b1, b2) = mesh.d1_l, mesh.d1_r
+    dy[..., 0] = a0*y[..., 0] + a1*y[..., 1] + a2*y[..., 2]
+    dy[..., -1] = b0*y[..., -1] + b1*y[..., -2] + b2*y[..., -3]
+
+
+def factor_tridiag(lower, diag, upper):
+    """
+    Factorize a tridiagonal matrix by cyclic reduction.
+
+    lower[i]*y[i-1] + diag[i]*y[i] + upper[i]*y[i+1]
+    lower[0] and upper[-1] are not used.
+    Each level eliminates the odd rows, row i takes
+    alpha = -lower[i]/diag[i-1] of row i-1 and
+    gamma = -upper[i]/diag[i+1] of row i+1, log2(nx) levels
+    of vectorized ops, O(nx) in all, stable for a diagonally
+    dominant matrix (diffusion, Poisson).
+    The factors can be reused by solve_factored for any rhs.
+    output: list of (lower, 1/diag of odd rows, upper, alpha, gamma)
+            per level, then 1/diag of the last row
+    """
+    shape = np.broadcast(lower, diag, upper).shape
+    a, b, c = [np.array(np.broadcast_to(v, shape), dtype=float)
+               for v in (lower, diag, upper)]
+    a[..., 0], c[..., -1] = 0.0, 0.0
+    fac = []
+    while a.shape[-1] > 1:
+        n = a.shape[-1]
+        # even rows with an odd row below (ne) and above (no)
+        ne, no = (n - 1)//2, n//2
+        rbo = 1.0/b[..., 1::2]
+        alpha = np.zeros(b[..., ::2].shape)
+        gamma = np.zeros_like(alpha)
+        alpha[..., 1:] = -a[..., 2::2]*rbo[..., :ne]
+        gamma[..., :no] = -c[..., 0:2*no:2]*rbo
+        a_new, c_new = np.zeros_like(alpha), np.zeros_like(alpha)
+        b_new = b[..., ::2].copy()
+        a_new[..., 1:] = alpha[..., 1:]*a[..., 1::2][..., :ne]
+        b_new[..., 1:] += alpha[..., 1:]*c[..., 1::2][..., :ne]
+        b_new[..., :no] += gamma[..., :no]*a[..., 1::2]
+        c_new[..., :no] = gamma[..., :no]*c[..., 1::2]
+        fac.append((a, rbo, c, alpha, gamma))
+        a, b, c = a_new, b_new, c_new
+    fac.append(1.0/b)
+    return fac
+
+
+def solve_factored(fac, rhs, out=None):
+    """
+    Solve a tridiagonal system from factor_tridiag, O(nx).
+
+    fac: levels from factor_tridiag
+    rhs: right hand side, may carry leading batch dims
+    out: optional array to write y into
+    output: y
+    """
+    d = np.asarray(rhs, dtype=float)
+    ds = []
+    # reduce the rhs to the last row
+    for a, rbo, c, alpha, gamma in fac[:-1]:
+        n = d.shape[-1]
+        ds.append(d)
+        d_new = np.empty(np.broadcast_shapes(d[..., ::2].shape, alpha.shape))
+        d_new[...] = d[..., ::2]
+        d_new[..., 1:] += alpha[..., 1:]*d[..., 1::2][..., :(n - 1)//2]
+        d_new[..., :n//2] += gamma[..., :n//2]*d[..., 1::2]
+        d = d_new
+    y = d*fac[-1]
+    # back substitution of the odd rows, level by level
+    for (a, rbo, c, alpha, gamma), d in zip(fac[-2::-1], ds[::-1]):
+        n = d.shape[-1]
+        ne, no = (n - 1)//2, n//2
+        y_new = np.empty(np.broadcast_shapes(d.shape, a.shape))
+        y_new[..., ::2] = y
+        odd = d[..., 1::2] - a[..., 1::2]*y[..., :no]
+        odd[..., :ne] -= c[..., 1::2][..., :ne]*y[..., 1:]
+        y_new[..., 1::2] = odd*rbo
+        y = y_new
+    if out is None:
+        return y
+    out[...] = y
+    return out
+
+
+def solve_tridiag(lower, diag, upper, rhs, out=None):
+    """
+    Solve a tridiagonal system by cyclic reduction, O(nx).
+
+    lower[i]*y[i-1] + diag[i]*y[i] + upper[i]*y[i+1] = rhs[i]
+    lower[0] and upper[-1] are not used.
+    Inputs may carry leading batch dims, solved along the last axis.
+    out: optional array to write y into
+    output: y
+    """
+    fac = factor_tridiag(lower, diag, upper)
+    return solve_factored(fac, rhs, out=out)
+
+
+def remap(y, x_old, x_new):
+    """
+    Interpolate y from nodes x_old to nodes x_new (linear).
+
+    y: shape (..., nx_old), interpolated along the last axis
+    output: array of shape (..., nx_new)
+    """
+    y = np.asarray(y, dtype=float)
+    res = np.empty(y.shape[:-1] + (len(x_new),))
+    for idx in np.ndindex(y.shape[:-1]):
+        res[idx] = np.interp(x_new, x_old, y[idx])
+    return res
+
+
+def stretch(width, nc, ratio):
+    """
+    Node positions with geometric clustering at both walls.
+
+    nc: number of cells
+    ratio: growth ratio of neighbouring cells, towards the center
+    """
+    k = np.arange(nc)
+    dx = ratio**np.minimum(k, nc - 1 - k)
+    return np.concatenate(([0.0], np.cumsum(dx)))*width/np.sum(dx)
+
 
 class Mesh_1d(Geom_1d):
     """Define 1d Mesh."""
 
-    def __init__(self, label, width, nx=11, res=0.1):
-        """Add option to choose nx or res for mesh."""
+    def __init__(self, label, width, nx=11, res=None, ratio=1.0, x=None):
+        """
+        Add option to choose nx or res for mesh.
+
+        nx: number of nodes
+        res: m, spacing at the walls, overrides nx if given
+        ratio: growth ratio of the spacing from the walls to the center
+               1.0 - uniform, > 1.0 clusters nodes at both walls
+        x: m, node positions, overrides nx, res and ratio
+        """
         super().__init__(label, width)
-        self.nx = nx
-        self.delx = self.width/(self.nx-1)
-        self.x = np.linspace(0.0, self.width, self.nx)
+        self.ratio = ratio
+        if x is None:
+            if res is not None:
+                nx = self.calc_nx(res, ratio)
+            x = stretch(self.width, nx - 1, ratio)
+        self.x = np.asarray(x, dtype=float)
+        self.nx = len(self.x)
+        self.dx = np.diff(self.x)  # cell sizes
+        self.delx = np.min(self.dx)
+        self.uniform = bool(np.allclose(self.dx, self.dx[0], rtol=1e-10))
+        self.work = {}  # scratch of non-uniform stencils, by shape
+        self.init_diff()
+
+    def calc_nx(self, res, ratio):
+        """Calc the least nx with spacing <= res at the walls."""
+        nlo, nhi = 1, max(int(np.ceil(self.width/res)), 1)
+        while nlo < nhi:
+            nc = (nlo + nhi)//2
+            if stretch(self.width, nc, ratio)[1] <= res*(1.0 + 1e-12):
+                nhi = nc
+            else:
+                nlo = nc + 1
+        return nhi + 1
 
     def __str__(self):
         """Print 1d mesh information."""
@@ -28,6 +203,8 @@ class Mesh_1d(Geom_1d):
         res += '\n ' + super().__str__()
         res += f'\nnx = {self.nx}'
         res += f'\ndelx = {self.delx} m'
+        if not self.uniform:
+            res += f'\nmax delx = {np.max(self.dx)} m'
         return res
 
     def add_bndy(self):
@@ -40,48 +217,187 @@ class Mesh_1d(Geom_1d):
 
     def plot_mesh(self):
         """Plot 1d mesh in X."""
-        fig, ax = plt.subplots(1, 1, figsize=(4, 4),
-                               constrained_layout=True)
-        y = np.zeros_like(self.x)
-        ax.plot(self.x, y, 'o')
-        plt.show(fig)
+        from RctMod1d_Plot import plot_mesh
+        plot_mesh(self)
 
-    def cnt_diff(self, y):
+    def init_diff(self, bndy_d1=bndy_copy, bndy_d2=bndy_copy):
+        """
+        Build the differencing operators once.
+
+        hm, hp = x[i] - x[i-1], x[i+1] - x[i]
+        d1_m,0,p: stencil weights of dy/dx on the interior nodes
+        lap_m,0,p: tridiagonal coeffs of d2/dx2, zero on boundary rows
+        d1_l, d1_r: one-sided weights of dy/dx at the walls
+        coef_d1: 1/(2*dx), coef_d2: 1/dx^2, on a uniform mesh
+        bndy_d1,2: boundary closure, func(dy, y, mesh), fills dy[0], dy[-1]
+        """
+        hm, hp = self.dx[:-1], self.dx[1:]
+        hs = hm + hp
+        self.d1_m = -hp/(hm*hs)
+        self.d1_0 = (hp - hm)/(hm*hp)
+        self.d1_p = hm/(hp*hs)
+        self.lap_m = np.zeros(self.nx)
+        self.lap_0 = np.zeros(self.nx)
+        self.lap_p = np.zeros(self.nx)
+        self.lap_m[1:-1] = 2.0/(hm*hs)
+        self.lap_0[1:-1] = -2.0/(hm*hp)
+        self.lap_p[1:-1] = 2.0/(hp*hs)
+        h1, h2 = self.dx[0], self.dx[1]
+        self.d1_l = (-(2.0*h1 + h2)/(h1*(h1 + h2)), (h1 + h2)/(h1*h2),
+                     -h1/(h2*(h1 + h2)))
+        h1, h2 = self.dx[-1], self.dx[-2]
+        self.d1_r = ((2.0*h1 + h2)/(h1*(h1 + h2)), -(h1 + h2)/(h1*h2),
+                     h1/(h2*(h1 + h2)))
+        self.coef_d1 = 0.5/self.dx[0]
+        self.coef_d2 = 1.0/self.dx[0]**2
+        self.bndy_d1 = bndy_d1
+        self.bndy_d2 = bndy_d2
+
+    def scratch(self, y):
+        """Return a reused scratch array of the shape of y[..., 1:-1]."""
+        shape = y.shape[:-1] + (self.nx - 2,)
+        work = self.work.get(shape)
+        if work is None:
+            work = self.work[shape] = np.empty(shape)
+        return work
+
+    def stencil(self, y, wm, w0, wp, out):
+        """Apply a 3-point stencil to the interior, out = wm*y[i-1] + ..."""
+        work = self.scratch(y)
+        np.multiply(y[..., :-2], wm, out=out)
+        np.multiply(y[..., 1:-1], w0, out=work)
+        out += work
+        np.multiply(y[..., 2:], wp, out=work)
+        out += work
+
+    def cnt_diff(self, y, out=None):
         """
         Caculate dy/dx using central differencing.
-        
-        input: y
-        dy/dx = (y[i+1] - y[i-1])/(2.0*dx)
-        dy[0] = dy[1]; dy[-1] = dy[-2]
+
+        input: y, shape (nx,) or (n_cases, nx)
+        dy/dx = (y[i+1] - y[i-1])/(2.0*dx) on a uniform mesh,
+        weights d1_m,0,p on a non-uniform mesh,
+        exact for quadratics, 2nd order in the local spacing
+        dy[0] = dy[1]; dy[-1] = dy[-2] by default, see bndy_d1
+        out: optional array to write dy into, no allocation if given
         output: dy
         """
-        dy = np.zeros_like(self.x)
+        dy = np.empty_like(y, dtype=float) if out is None else out
         # Although dy[0] and dy[-1] are signed here,
         # they are eventually specified in boundary conditions
-        # dy[0] = dy[1]; dy[-1] = dy[-2]
-        for i in range(1, self.nx-1):
-            dy[i] = (y[i+1] - y[i-1])/self.delx/2.0
-        dy[0], dy[-1] = deepcopy(dy[1]), deepcopy(dy[-2])
+        if self.uniform:
+            np.subtract(y[..., 2:], y[..., :-2], out=dy[..., 1:-1])
+            dy[..., 1:-1] *= self.coef_d1
+        else:
+            self.stencil(y, self.d1_m, self.d1_0, self.d1_p, dy[..., 1:-1])
+        self.bndy_d1(dy, y, self)
         return dy
-    
-    def cnt_diff_2nd(self, y):
+
+    def cnt_diff_2nd(self, y, out=None):
         """
-        Caculate d2y/dx2 using 2nd order central differencing.
+        Caculate d2y/dx2 using central differencing.
 
-        input: y
-        d2y/dx2 = (y[i+1] - 2 * y[i] + y[i-1])/dx^2
-        d2y[0] = d2y[1]; d2y[-1] = d2y[-2]
+        input: y, shape (nx,) or (n_cases, nx)
+        d2y/dx2 = (y[i+1] - 2 * y[i] + y[i-1])/dx^2 on a uniform mesh,
+        2nd order
+        weights lap_m,0,p on a non-uniform mesh, 1st order,
+        error ~ (hp - hm)/3 * d3y/dx3, i.e. 2nd order only where
+        the spacing varies smoothly (hp - hm ~ h^2)
+        d2y[0] = d2y[1]; d2y[-1] = d2y[-2] by default, see bndy_d2
+        out: optional array to write d2y into, no allocation if given
         output: d2y/dx2
         """
-        d2y = np.zeros_like(self.x)
+        d2y = np.empty_like(y, dtype=float) if out is None else out
         # Although dy[0] and dy[-1] are signed here,
         # they are eventually specified in boundary conditions
-        # d2y[0] = d2y[1]; d2y[-1] = d2y[-2]
-        for i in range(1, self.nx-1):
-            d2y[i] = (y[i+1] - 2 * y[i] + y[i-1])/self.delx**2
-        d2y[0], d2y[-1] = deepcopy(d2y[1]), deepcopy(d2y[-2])
+        if self.uniform:
+            np.add(y[..., 2:], y[..., :-2], out=d2y[..., 1:-1])
+            d2y[..., 1:-1] -= y[..., 1:-1]
+            d2y[..., 1:-1] -= y[..., 1:-1]
+            d2y[..., 1:-1] *= self.coef_d2
+        else:
+            self.stencil(y, self.lap_m[1:-1], self.lap_0[1:-1],
+                         self.lap_p[1:-1], d2y[..., 1:-1])
+        self.bndy_d2(d2y, y, self)
         return d2y
 
+    def calc_err_ind(self, y):
+        """
+        Calc the refinement indicator on the nodes.
+
+        ind = |d2y/dx2|*hm*hp/max|y|, the interpolation error
+        relative to the solution; max over cases in batch mode,
+        zero for y = 0.
+        output: array (nx,), zero at the walls
+        """
+        y = np.asarray(y, dtype=float)
+        d2y = np.zeros_like(y)
+        self.stencil(y, self.lap_m[1:-1], self.lap_0[1:-1],
+                     self.lap_p[1:-1], d2y[..., 1:-1])
+        ind = np.abs(d2y)*np.concatenate(([0.0], self.dx[:-1]*self.dx[1:],
+                                          [0.0]))
+        ind /= np.maximum(np.max(np.abs(y), axis=-1, keepdims=True), TINY)
+        return ind.reshape(-1, self.nx).max(axis=0)
+
+    def adapt(self, y, tol_ref=1e-3, tol_crs=None, dx_min=0.0,
+              max_ratio=2.0):
+        """
+        Refine/coarsen the mesh by the indicator of y, see calc_err_ind.
+
+        tol_ref: cells next to a node with ind > tol_ref are halved
+        tol_crs: interior nodes with ind < tol_crs are removed,
+                 default tol_ref/16, never two neighbouring nodes
+        dx_min: m, cells are not split below this size
+        max_ratio: max size ratio of neighbouring cells, larger cells
+                   are split until the mesh is graded
+        output: new Mesh_1d, or self if nothing changed
+                use remap() to carry arrays over to the new mesh
+        """
+        tol_crs = tol_ref/16.0 if tol_crs is None else tol_crs
+        ind = self.calc_err_ind(y)
+        # split cells
+        flag = np.maximum(ind[:-1], ind[1:]) > tol_ref
+        flag &= self.dx > 2.0*dx_min
+        # remove every other node of a run of smooth interior nodes
+        keep = np.ones(self.nx, dtype=bool)
+        smooth = ind < tol_crs
+        smooth[0] = smooth[-1] = False
+        # nodes next to a split cell are kept
+        smooth[:-1] &= ~flag
+        smooth[1:] &= ~flag
+        for i in range(1, self.nx - 1):
+            if smooth[i] and keep[i-1]:
+                keep[i] = False
+        if not (flag.any() or not keep.all()):
+            return self
+        xmid = 0.5*(self.x[:-1] + self.x[1:])[flag]
+        x = np.sort(np.concatenate((self.x[keep], xmid)))
+        while True:
+            dx = np.diff(x)
+            flag = np.zeros(len(dx), dtype=bool)
+            flag[1:] |= dx[1:] > max_ratio*dx[:-1]
+            flag[:-1] |= dx[:-1] > max_ratio*dx[1:]
+            if not flag.any():
+                break
+            xmid = 0.5*(x[:-1] + x[1:])[flag]
+            x = np.sort(np.concatenate((x, xmid)))
+        return Mesh_1d(self.label, self.width, x=x)
+
+    def solve_diff(self, c, coef, rhs, out=None):
+        """
+        Solve the implicit diffusion system (c - coef*d2/dx2) y = rhs.
+
+        c: coeff of y, scalar or array
+        coef: diffusion coeff times theta*dt, scalar or array
+        rhs: right hand side
+        Boundary rows reduce to c*y = rhs (Dirichlet).
+        output: y
+        """
+        lower = -coef*self.lap_m
+        diag = c - coef*self.lap_0
+        upper = -coef*self.lap_p
+        return solve_tridiag(lower, diag, upper, rhs, out=out)
+
 
 if __name__ == '__main__':
     """Test Mesh."""
@@ -90,4 +406,24 @@ if __name__ == '__main__':
                      nx=101)
     # print(geom1d)
     print(mesh1d)
+    # wall clustered mesh at a fixed ratio, the center cells hardly
+    # shrink with nx and d2 is 1st order there, the errors drop slowly
+    for nx in (51, 101):
+        mesh1d = Mesh_1d('A', 10e-2, nx=nx, ratio=1.05)
+        y = np.sin(30.0*mesh1d.x)
+        err1 = np.abs(mesh1d.cnt_diff(y) - 30.0*np.cos(30.0*mesh1d.x))
+        err2 = np.abs(mesh1d.cnt_diff_2nd(y) + 900.0*y)
+        print(f'nx = {nx}: max err d1 = {err1[1:-1].max():.3e}, '
+              f'd2 = {err2[1:-1].max():.3e}')
+    mesh1d = Mesh_1d('A', 10e-2, res=1e-4, ratio=1.1)
+    print(mesh1d)
+    # refine towards a steep wall layer
+    mesh1d = Mesh_1d('A', 10e-2, nx=21)
+    for itn in range(10):
+        y = np.tanh(mesh1d.x/1e-3)*np.tanh((mesh1d.width - mesh1d.x)/1e-3)
+        new = mesh1d.adapt(y, tol_ref=1e-3)
+        if new is mesh1d:
+            break
+        mesh1d = new
+    print(mesh1d)
     mesh1d.plot_mesh()
@@ -0,0 +1,175 @@
+"""
+1D Plasma Periodic Steady State Module
+
+PSS_1d contains:
+    run of a periodically driven model (e.g. RFPower_1d) one period
+        at a time, state y_n sampled at the start of each period
+    extrapolation over periods to the periodic steady state
+        reduced rank extrapolation (RRE) of the last k + 1 periods,
+            d_j = y_j+1 - y_j, min |sum(g_j*d_j)| with sum(g_j) = 1,
+            y* = sum(g_j*y_j), exact for a linear period map
+            with k decay modes, all variables together
+        step to y* limited to keep y positive
+        k periods are run between extrapolations
+    convergence when max|d_n|/max|y| < tol for all variables
+    Input: func advancing one period, state arrays (in place)
+    Output: state at the periodic steady state, self.hist
+"""
+
+import logging
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class PSS_1d(object):
+    """Define the periodic steady state accelerator."""
+
+    def __init__(self, tol=1e-6, every=8, accel=True):
+        """
+        Init the accelerator.
+
+        tol: tolerance of the change per period, max|d_n|/max|y|
+        every: k, number of periods between extrapolations
+        accel: extrapolate, False - plain run of periods
+        """
+        self.tol, self.every, self.accel = tol, every, accel
+        self.ncycle, self.njump = 0, 0
+        self.converged = False
+        self.hist = []  # (period, residual)
+
+    def __str__(self):
+        """Print accelerator statistics."""
+        res = 'PSS_1d:'
+        res += f'\nconverged = {self.converged}'
+        res += f'\nperiods = {self.ncycle}, extrapolations = {self.njump}'
+        return res
+
+    def extrap(self, ys):
+        """
+        Calc the RRE coefficients of the sampled states.
+
+        ys: list of k + 2 stacked states, each scaled to max 1
+        output: g, k + 1 coefficients, sum(g) = 1
+        """
+        d = np.diff(np.array(ys), axis=0)
+        g = np.linalg.lstsq(d @ d.T, np.ones(len(d)), rcond=None)[0]
+        return g/g.sum()
+
+    def run(self, cycle, arrays, ncycle, post=None):
+        """
+        Run up to ncycle periods, with extrapolation.
+
+        cycle: func(), advances the model by one period
+        arrays: list of positive state arrays, changed in place
+                by cycle and by the extrapolation,
+                e.g. [pla.ne, pla.ni, een.Te]
+        post: func(), called after an extrapolation to make the model
+              consistent, e.g. b.c. and derived arrays
+        output: True if converged
+        """
+        def sample():
+            return [y.copy() for y in arrays]
+        hist = [sample()]
+        for icycle in range(ncycle):
+            cycle()
+            self.ncycle += 1
+            res = max(np.max(np.abs(y - y_old))/max(np.max(np.abs(y)), 1e-300)
+                      for y, y_old in zip(arrays, hist[-1]))
+            self.hist.append((self.ncycle, res))
+            if res < self.tol:
+                self.converged = True
+                log.info('PSS after %d periods', self.ncycle)
+                return True
+            hist.append(sample())
+            if self.accel and len(hist) == self.every + 2:
+                scale = [max(np.max(np.abs(y)), 1e-300) for y in arrays]
+                g = self.extrap([np.concatenate([(y/c).ravel()
+                                                 for y, c in zip(ys, scale)])
+                                 for ys in hist])
+                steps = [sum(gj*ys[ivar] for gj, ys in zip(g, hist[:-1])) - y
+                         for ivar, y in enumerate(arrays)]
+                # keep y positive, at most half of y removed
+                frac = 1.0
+                for y, step in zip(arrays, steps):
+                    neg = step < 0.0
+                    if neg.any():
+                        frac = min(frac, 0.5*np.min(y[neg]/-step[neg]))
+                for y, step in zip(arrays, steps):
+                    y += frac*step
+                if post is not None:
+                    post()
+                self.njump += 1
+                hist = [sample()]
+        return False
+
+
+if __name__ == '__main__':
+    """Test PSS_1d."""
+    import time
+    from Constants import KB_EV
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_Eergy import Eergy_1d
+    from RctMod1d_Power import RFPower_1d
+    logging.basicConfig(level=logging.INFO)
+    # eon energy in a 100 kHz RF cycle, density frozen
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    txp1d.calc_ambi(pla1d)
+    nphase = 32
+
+    def build(mode):
+        een1d = Eergy_1d(pla1d)
+        rf1d = RFPower_1d(pla1d, freq=1e5, mode=mode, nphase=nphase)
+        return een1d, rf1d
+
+    def cycle_func(een1d, rf1d, state):
+        dt = rf1d.period/nphase
+
+        def cycle():
+            for iphase in range(nphase):
+                rf1d.calc_pwr_in(pla1d, 1.0, t=state['t'])
+                een1d.calc_th_cond_coeff(pla1d)
+                een1d.calc_th_flux(pla1d, txp1d)
+                een1d.calc_Te(dt, pla1d, rf1d)
+                een1d.bndy_Te()
+                state['t'] += dt
+        return cycle
+
+    def post_func(een1d):
+        def post():
+            een1d.bndy_Te()
+            np.multiply(pla1d.ne, een1d.Te, out=een1d.ergy_e)
+            een1d.ergy_e *= 1.5*KB_EV
+        return post
+
+    res = {}
+    for name, accel in (('brute force', False), ('extrapolated', True)):
+        een1d, rf1d = build('cycle')
+        pss = PSS_1d(tol=1e-7, accel=accel)
+        t0 = time.perf_counter()
+        pss.run(cycle_func(een1d, rf1d, dict(t=0.0)), [een1d.Te], 40000,
+                post=post_func(een1d))
+        print(f'{name}: {time.perf_counter() - t0:.2f} s')
+        print(pss)
+        res[name] = een1d.Te.copy()
+    print('max |Te diff| =',
+          np.abs(res['brute force'] - res['extrapolated']).max())
+    # cycle-averaged, one step per period
+    een1d, rf1d = build('avg')
+    rf1d.calc_pwr_in(pla1d, 1.0)
+    pss = PSS_1d(tol=1e-7)
+
+    def cycle_avg():
+        een1d.calc_th_cond_coeff(pla1d)
+        een1d.calc_th_flux(pla1d, txp1d)
+        een1d.calc_Te(rf1d.period, pla1d, rf1d, theta=1.0)
+        een1d.bndy_Te()
+    pss.run(cycle_avg, [een1d.Te], 40000, post=post_func(een1d))
+    print('cycle-averaged:', pss)
+    print('max |Te diff| vs. cycle-resolved =',
+          np.abs(res['brute force'] - een1d.Te).max())
@@ -0,0 +1,207 @@
+"""
+1D Plasma Parallel-in-Time Module
+
+Para_1d contains:
+    Parareal over nslice time slices of a long transient
+        (power pulsing, ...), states ne, ni, Te at the slice ends
+        coarse propagator G: coarse Mesh_1d, large implicit dt, serial
+        fine propagator F: the model as run serially, in a process pool
+        U_n+1(k+1) = G(U_n(k+1)) + F(U_n(k)) - G(U_n(k))
+        slices up to k are exact after iteration k
+    convergence when max|U(k+1) - U(k)|/max|U| < tol over all slices
+    states are kept on the fine mesh, the coarse ones are remapped
+    Input: model dicts of F and G, initial state
+    Output: states at the slice ends, self.hist
+"""
+
+from RctMod1d_Mesh import remap
+
+import concurrent.futures as cf
+import functools
+import logging
+import os
+import time
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# default model, the fine propagator
+MODEL = dict(width=10e-2, nx=101,
+             ne=1e17, press=10, Te=1, Ti=0.1, Mi=40,
+             pulse=((0.0, 1.0),),
+             dt_den=2.5e-7, dt_Te=1e-7, theta=0.0)
+# changes of the coarse propagator
+COARSE = dict(nx=26, dt_den=2e-5, dt_Te=2e-5, theta=1.0)
+VARS = ('ne', 'ni', 'Te')
+
+
+def propagate(model, state, t0, t1, x=None):
+    """
+    Advance a state from t0 to t1 with one model.
+
+    model: dict of parameters, missing ones are taken from MODEL
+           pulse: ((t, pwr), ...), W/m^3, power linear in t
+    state: dict of x, ne, ni, Te, None - init from the model
+    x: nodes of the output, default the model mesh
+    output: dict of x, ne, ni, Te
+    """
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Eergy import Eergy_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Sim import build_sim
+    model = dict(MODEL, **model)
+    mesh1d = Mesh_1d('Para_1d', model['width'], nx=model['nx'])
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma(ne=model['ne'], press=model['press'], Te=model['Te'],
+                      Ti=model['Ti'], Mi=model['Mi'])
+    if state is not None:
+        for name in VARS:
+            getattr(pla1d, name)[...] = remap(state[name], state['x'],
+                                              mesh1d.x)
+        pla1d.touch(*VARS)
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    een1d = Eergy_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    tp, pp = np.array(model['pulse'], dtype=float).T
+    sim = build_sim(pla1d, txp1d, src1d, een1d, pwr1d,
+                    dt_den=model['dt_den'], dt_Te=model['dt_Te'],
+                    dt_pwr=model['dt_den'],
+                    pwr_in=functools.partial(np.interp, xp=tp, fp=pp),
+                    theta=model['theta'], couple=True)
+    sim.t = t0
+    sim.run(t1)
+    x = mesh1d.x if x is None else x
+    res = dict(x=x)
+    for name in VARS:
+        res[name] = remap(getattr(pla1d, name), mesh1d.x, x)
+    return res
+
+
+class Para_1d(object):
+    """Define the Parareal driver."""
+
+    def __init__(self, fine, coarse=COARSE, nslice=None, nworker=None,
+                 tol=1e-4, maxiter=None):
+        """
+        Init the driver.
+
+        fine: dict of the model, see MODEL
+        coarse: changes of the coarse model
+        nslice: number of time slices, default nworker
+        nworker: number of processes, default os.cpu_count()
+        tol: tolerance of the change of the slice ends per iteration
+        maxiter: max number of iterations, default nslice,
+                 after which the result is the serial fine solution
+        """
+        self.fine = dict(MODEL, **fine)
+        self.coarse = dict(self.fine, **coarse)
+        self.nworker = nworker or os.cpu_count()
+        self.nslice = nslice or self.nworker
+        self.tol = tol
+        self.maxiter = maxiter or self.nslice
+        self.hist = []  # (iteration, error, wall time)
+        self.converged = False
+
+    def __str__(self):
+        """Print Parareal information."""
+        res = 'Para_1d:'
+        res += f'\nnslice = {self.nslice}, nworker = {self.nworker}'
+        res += f'\nconverged = {self.converged}, iterations = '
+        res += f'{len(self.hist)}'
+        for itn, err, wall in self.hist:
+            res += f'\niteration {itn}: error = {err:.3e}, {wall:.2f} s'
+        return res
+
+    def calc_coarse(self, state, t0, t1, x):
+        """Run the coarse propagator, output on the fine nodes."""
+        return propagate(self.coarse, state, t0, t1, x=x)
+
+    def correct(self, g_new, f_old, g_old):
+        """
+        Calc the Parareal update G(U(k+1)) + F(U(k)) - G(U(k)).
+
+        Kept above 10% of the coarse value, the update is not
+        guaranteed positive.
+        """
+        res = dict(x=g_new['x'])
+        for name in VARS:
+            val = g_new[name] + f_old[name] - g_old[name]
+            res[name] = np.maximum(val, 0.1*g_new[name])
+        return res
+
+    def calc_err(self, new, old):
+        """Calc the change of the slice ends."""
+        return max(np.max(np.abs(u[name] - v[name]))/np.max(np.abs(u[name]))
+                   for u, v in zip(new, old) for name in VARS)
+
+    def run(self, t_end, state=None):
+        """
+        Run Parareal from 0 to t_end.
+
+        state: initial dict of x, ne, ni, Te, None - from the model
+        output: list of nslice + 1 states at the slice ends
+        """
+        t = np.linspace(0.0, t_end, self.nslice + 1)
+        # the slice ends must fall on fine steps
+        t = np.round(t/self.fine['dt_den'])*self.fine['dt_den']
+        if state is None:
+            state = propagate(self.fine, None, 0.0, 0.0)
+        x = state['x']
+        u = [state]
+        g = []
+        for n in range(self.nslice):
+            g.append(self.calc_coarse(u[n], t[n], t[n + 1], x))
+            u.append(g[n])
+        with cf.ProcessPoolExecutor(max_workers=self.nworker) as pool:
+            for itn in range(self.maxiter):
+                t0 = time.perf_counter()
+                # slices before itn are exact, their F is not needed
+                f = dict(zip(range(itn, self.nslice), pool.map(
+                    propagate, [self.fine]*(self.nslice - itn),
+                    u[itn:-1], t[itn:-1], t[itn + 1:],
+                    [x]*(self.nslice - itn))))
+                u_new = u[:itn + 1] + [f[itn]]
+                for n in range(itn + 1, self.nslice):
+                    g_new = self.calc_coarse(u_new[n], t[n], t[n + 1], x)
+                    u_new.append(self.correct(g_new, f[n], g[n]))
+                    g[n] = g_new
+                err = self.calc_err(u_new[itn + 1:], u[itn + 1:])
+                u = u_new
+                self.hist.append((itn + 1, err, time.perf_counter() - t0))
+                log.info('iteration %d, error = %.3e', itn + 1, err)
+                if err < self.tol or itn + 1 == self.nslice:
+                    self.converged = True
+                    break
+        return u
+
+
+if __name__ == '__main__':
+    """Test Para_1d."""
+    logging.basicConfig(level=logging.INFO)
+    # power pulsing, 1 -> 0.2 W/m^3 at 1 ms, back to 1 at 2 ms
+    fine = dict(pulse=((0.0, 1.0), (1e-3, 1.0), (1.01e-3, 0.2),
+                       (2e-3, 0.2), (2.01e-3, 1.0)))
+    t_end, nslice = 4e-3, 8
+    t0 = time.perf_counter()
+    ref = propagate(fine, None, 0.0, t_end)
+    t_serial = time.perf_counter() - t0
+    print(f'serial fine: {t_serial:.2f} s')
+    para = Para_1d(fine, nslice=nslice, tol=1e-4)
+    t0 = time.perf_counter()
+    u = para.run(t_end)
+    print(para)
+    print(f'Parareal: {time.perf_counter() - t0:.2f} s '
+          f'on {para.nworker} worker(s)')
+    for name in VARS:
+        print(f'max |{name} - serial|/max|{name}| =',
+              np.max(np.abs(u[-1][name] - ref[name]))/np.max(ref[name]))
+    # with nslice workers, one iteration costs a fine slice
+    # plus the serial coarse runs
+    niter = len(para.hist)
+    print(f'ideal wall time on {nslice} workers: '
+          f'{niter*t_serial/nslice:.2f} s + coarse, '
+          f'speedup <= {nslice/niter:.1f}')
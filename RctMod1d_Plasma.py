@@ -7,10 +7,9 @@ Plasma_1d contains:
 """
 
 from Constants import AMU
+from RctMod1d_Mesh import remap
 
 import numpy as np
-import matplotlib.pyplot as plt
-from copy import deepcopy
 
 
 class Plasma_1d(object):
@@ -23,8 +22,9 @@ class Plasma_1d(object):
         Plasma_1d as a basket containing:
             geometry
             physics.
+        The mesh is shared, not copied.
         """
-        self.geom = deepcopy(geom)
+        self.geom = geom
 
     def __str__(self):
         """Print 1d mesh information."""
@@ -49,104 +49,211 @@ class Plasma_1d(object):
                             1e8 at 100 mTorr
                             1e9 at 1000 mTorr
         Mi: kg, ion mass
+        Batch mode: any of ne, press, Te, Ti, Mi may be a 1d array of
+        n_cases values, then all variables have shape (n_cases, nx).
+        All variables are views into one contiguous buffer, self.state,
+        and are only ever updated in place.
         """
         nx = self.geom.nx
-        self.ne = np.ones(nx)*ne  # init uniform ne on 1d mesh
-        self.ni = np.ones(nx)*ne  # init ni to neutralize ne
-        self.nn = np.ones(nx)*(press*3.3e19)  # init neutral density
+        ne, press, Te, Ti, Mi = [self.bcast(var)
+                                 for var in (ne, press, Te, Ti, Mi)]
+        shape = np.broadcast_shapes(ne.shape, press.shape, Te.shape,
+                                    Ti.shape, Mi.shape, (nx,))
+        # struct of arrays: ne, ni, nn, Te, Ti, coll_em, coll_im
+        self.state = np.empty((7,) + shape)
+        self.bind_state()
+        self.ne[...] = ne  # init uniform ne on 1d mesh
+        self.ni[...] = ne  # init ni to neutralize ne
+        self.nn[...] = press*3.3e19  # init neutral density
         self.press = press
-        self.Te = np.ones(nx)*Te  # init eon temperature
-        self.Ti = np.ones(nx)*Ti  # init ion temperature
-        self.coll_em = np.ones(nx)*(press/10.0*1e7)  # eon coll freq (mom)
-        self.coll_im = np.ones(nx)*(press/10.0*1e7)  # ion coll freq (mom)
+        self.Te[...] = Te  # init eon temperature
+        self.Ti[...] = Ti  # init ion temperature
+        self.coll_em[...] = press/10.0*1e7  # eon coll freq (mom)
+        self.coll_im[...] = press/10.0*1e7  # ion coll freq (mom)
         self.Mi = Mi*AMU # ion mass 
+        # version counters, bumped whenever a variable changes
+        self.ver = dict.fromkeys(self.var_names, 0)
+        # versions at the last bndy_plasma and limit_plasma
+        self.bndy_ver, self.limit_ver = {}, {}
+        self.touch()
         self.bndy_plasma()
         self.limit_plasma()
 
+    var_names = ('ne', 'ni', 'nn', 'Te', 'Ti', 'coll_em', 'coll_im', 'Mi',
+                 'press')
+
+    def bind_state(self):
+        """
+        Bind the variables to views of self.state.
+
+        Needed whenever self.state is replaced, e.g. on a restart,
+        the scratch array self.work is reallocated too.
+        """
+        (self.ne, self.ni, self.nn, self.Te, self.Ti,
+         self.coll_em, self.coll_im) = self.state
+        self.work = np.empty_like(self.ne)  # scratch for den_evolve
+
+    def touch(self, *names):
+        """
+        Mark variables as changed, all of them if no name is given.
+
+        Must be called after changing a variable from outside Plasma_1d,
+        e.g. pla.Te[...] = een.Te; pla.touch('Te'),
+        or pla.press = 20; pla.touch('press'),
+        so modules caching results (Transp_1d) recompute them.
+        """
+        for name in names or self.var_names:
+            self.ver[name] += 1
+
+    def vers(self, names):
+        """Return the versions of variables, for change detection."""
+        return tuple(self.ver[name] for name in names)
+
+    def bcast(self, var):
+        """Turn a per-case parameter into shape (n_cases, 1)."""
+        var = np.asarray(var, dtype=float)
+        return var[..., np.newaxis] if var.ndim else var
+
+    def conv_mask(self, ne0, tol=1e-6):
+        """
+        Check which cases are still evolving.
+
+        ne0: ne from the previous check
+        tol: tolerance on max|ne - ne0|/max|ne| per case
+        output: bool array of n_cases (or a bool), True if not converged
+        """
+        dne = np.max(np.abs(self.ne - ne0), axis=-1)
+        return dne > tol*np.max(self.ne, axis=-1)
+
+    def remap(self, mesh):
+        """
+        Interpolate the plasma onto a new mesh, e.g. from Mesh_1d.adapt.
+
+        The arrays are reallocated with the new nx, so modules holding
+        arrays of the old shape (Transp_1d, Eergy_1d, ...) are rebuilt.
+        """
+        x_old = self.geom.x
+        self.geom = mesh
+        self.state = remap(self.state, x_old, mesh.x)
+        self.bind_state()
+        # potential attributes, see init_pot
+        for name in ('pot', 'ef', 'ef_ambi'):
+            if hasattr(self, name):
+                setattr(self, name, remap(getattr(self, name), x_old, mesh.x))
+        self.touch()
+
     def bndy_plasma(self):
-        """Impose b.c. on the plasma."""
-        self.ne[0], self.ne[-1] = 1e11, 1e11
-        self.ni[0], self.ni[-1] = 1e11, 1e11
-        self.nn[0], self.nn[-1] = 1e11, 1e11
-        self.Te[0], self.Te[-1] = 0.1, 0.1
-        self.Ti[0], self.Ti[-1] = 0.01, 0.01
+        """
+        Impose b.c. on the plasma.
+
+        Only variables touched since the last call are set, then touched,
+        the versions stand in for comparing the wall values.
+        """
+        for name, val in (('ne', 1e11), ('ni', 1e11), ('nn', 1e11),
+                          ('Te', 0.1), ('Ti', 0.01)):
+            if self.ver[name] == self.bndy_ver.get(name):
+                continue
+            var = getattr(self, name)
+            var[..., 0], var[..., -1] = val, val
+            self.ver[name] += 1
+            self.bndy_ver[name] = self.ver[name]
         # self.coll_em[0], self.coll_em[-1] = 1e5, 1e5
         # self.coll_im[0], self.coll_im[-1] = 1e5, 1e5
 
     def limit_plasma(self, n_min=1e11, n_max=1e22, T_min=0.001, T_max=100.0):
-        """Limit variables in the plasma."""
-        self.ne = np.clip(self.ne, n_min, n_max)
-        self.ni = np.clip(self.ni, n_min, n_max)
-        self.nn = np.clip(self.nn, n_min, n_max)
-        self.Te = np.clip(self.Te, T_min, T_max)
-        self.Ti = np.clip(self.Ti, T_min, T_max)
+        """Limit variables in the plasma, those touched since the last call."""
+        for name, vmin, vmax in (('ne', n_min, n_max), ('ni', n_min, n_max),
+                                 ('nn', n_min, n_max), ('Te', T_min, T_max),
+                                 ('Ti', T_min, T_max)):
+            if self.ver[name] == self.limit_ver.get(name):
+                continue
+            var = getattr(self, name)
+            if var.min() < vmin or var.max() > vmax:
+                np.clip(var, vmin, vmax, out=var)
+                self.ver[name] += 1
+            self.limit_ver[name] = self.ver[name]
 
     def plot_plasma(self):
-        """
-        Plot plasma variables vs. position x.
-
-        density, flux, temperature
-        """
-        x = self.geom.x
-        fig, axes = plt.subplots(1, 2, figsize=(8, 3),
-                                 constrained_layout=True)
-        # plot densities
-        ax = axes[0]
-        ax.plot(x, self.ne, 'b-')
-        ax.plot(x, self.ni, 'r-')
-        ax.legend(['E', 'Ion'])
-        ax.set_xlabel('Position (m)')
-        ax.set_ylabel('Density (m^-3)')
-        # plot temperature
-        ax = axes[1]
-        ax.plot(x, self.Te, 'b-')
-        ax.plot(x, self.Ti, 'r-')
-        ax.legend(['Te', 'Ti'])
-        ax.set_xlabel('Position (m)')
-        ax.set_ylabel('Temperature (eV)')
-        plt.show()
+        """Plot plasma variables vs. position x."""
+        from RctMod1d_Plot import plot_plasma
+        plot_plasma(self)
 
     def init_pot(self, phi=0.0):
         """Initiate potential attributes."""
-        nx = self.geom.nx
-        self.pot = np.ones(nx)*phi  # initial uniform potential
+        self.pot = np.ones_like(self.ne)*phi  # initial uniform potential
         self.ef = np.zeros_like(self.pot)  # initial uniform E-field
         self.ef_ambi = np.zeros_like(self.pot)  # initial ambipolar E-field
 
     def plot_pot(self):
         """Plot potential, E-field."""
-        x = self.geom.x
-        fig, axes = plt.subplots(1, 2, figsize=(8, 4),
-                                 constrained_layout=True)
-        # plot potential
-        ax = axes[0]
-        ax.plot(x, self.pot, 'y-')
-        ax.legend(['Potential'])
-        # plot E-field
-        ax = axes[1]
-        ax.plot(x, self.ef, 'g-')
-        ax.legend(['E-field'])
-        plt.show()
-
-    def den_evolve(self, delt, txp, src):
+        from RctMod1d_Plot import plot_pot
+        plot_pot(self)
+
+    def den_evolve(self, delt, txp, src, theta=0.0, active=None):
         """
         Evolve the density in Plasma by solving the continuity equation.
 
         dn/dt = -dFlux/dx + Se
         dn(t + dt) = dn(t) - dFlux/dx*dt + Se*dt
-        delt: time step for explict method
+        delt: time step
         txp: object for transport module
         src: object for reaction module
+             None - transport only, the sources are integrated
+             separately, e.g. by React_1d.chem_step (operator split)
+        theta: implicitness of the diffusion term
+               0.0 - explicit (forward Euler)
+               0.5 - Crank-Nicolson
+               1.0 - implicit (backward Euler)
+        For theta > 0, the diffusion term D*d2n/dx2 (D = txp.Dne,i)
+        is solved by a tridiagonal solve and the rest stays explicit.
+        active: bool array of n_cases in batch mode,
+                only active (not converged) cases are updated
+        """
+        self.touch('ne', 'ni')
+        if active is not None:
+            active = np.asarray(active)[..., np.newaxis]
+        se, si = (0.0, 0.0) if src is None else (src.se, src.si)
+        if not theta:
+            # explicit update in place, using the scratch array
+            for den, dflux, sden in ((self.ne, txp.dfluxe, se),
+                                     (self.ni, txp.dfluxi, si)):
+                np.subtract(sden, dflux, out=self.work)
+                self.work *= delt
+                if active is not None:
+                    self.work *= active
+                den += self.work
+            return
+        ne = self.den_implicit(self.ne, txp.dfluxe, se,
+                               txp.Dne, delt, theta)
+        ni = self.den_implicit(self.ni, txp.dfluxi, si,
+                               txp.Dni, delt, theta)
+        if active is None:
+            self.ne[...], self.ni[...] = ne, ni
+        else:
+            np.copyto(self.ne, ne, where=active)
+            np.copyto(self.ni, ni, where=active)
+
+    def den_implicit(self, den, dflux, se, D, delt, theta):
+        """
+        Advance one density by the theta-scheme.
+
+        (1 - theta*dt*D*L) n(t+dt) = n + dt*(-dFlux/dx + Se)
+                                       - theta*dt*D*L n
+        L: d2/dx2, boundary values are kept (Dirichlet).
         """
-        self.ne += (-txp.dfluxe + src.se)*delt
-        self.ni += (-txp.dfluxi + src.si)*delt
+        coef = theta*delt*D
+        rhs = den + (-dflux + se)*delt
+        rhs -= coef*self.geom.cnt_diff_2nd(den)
+        rhs[..., 0], rhs[..., -1] = den[..., 0], den[..., -1]
+        return self.geom.solve_diff(1.0, coef, rhs)
 
 
 if __name__ == '__main__':
     """Test Plasma_1d."""
-    from Mesh import Mesh_1d
-    from Transp1d import Diff_1d, Ambi_1d
-    from React1d import React_1d
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Render import Render_1d
     mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
     print(mesh1d)
     pla1d = Plasma_1d(mesh1d)
@@ -161,6 +268,7 @@ if __name__ == '__main__':
     #
     ne_ave, ni_ave = [], []
     time = []
+    ren = Render_1d(prefix='ne_evolution')
     dt = 1e-6
     niter = 3000
     for itn in range(niter):
@@ -172,5 +280,7 @@ if __name__ == '__main__':
         ni_ave.append(np.mean(pla1d.ni))
         time.append(dt*(niter+1))
         if not (itn+1) % (niter/10):
-            txp1d.plot_flux(pla1d)
-            pla1d.plot_plasma()
+            ren.submit(itn+1, dt*(itn+1), mesh1d.x,
+                       flux=[txp1d.fluxe, txp1d.fluxi],
+                       density=[pla1d.ne, pla1d.ni])
+    ren.close()
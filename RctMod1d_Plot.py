@@ -0,0 +1,128 @@
+"""
+1D Plasma Plot Module
+
+Plot functions of all modules, kept apart from the numerical core.
+The modules import it lazily, matplotlib is loaded on the first plot.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def plot_mesh(mesh):
+    """Plot 1d mesh in X."""
+    fig, ax = plt.subplots(1, 1, figsize=(4, 4),
+                           constrained_layout=True)
+    y = np.zeros_like(mesh.x)
+    ax.plot(mesh.x, y, 'o')
+    plt.show()
+
+
+def plot_plasma(pla):
+    """
+    Plot plasma variables vs. position x.
+
+    density, flux, temperature
+    """
+    x = pla.geom.x
+    fig, axes = plt.subplots(1, 2, figsize=(8, 3),
+                             constrained_layout=True)
+    # plot densities
+    ax = axes[0]
+    ax.plot(x, pla.ne, 'b-')
+    ax.plot(x, pla.ni, 'r-')
+    ax.legend(['E', 'Ion'])
+    ax.set_xlabel('Position (m)')
+    ax.set_ylabel('Density (m^-3)')
+    # plot temperature
+    ax = axes[1]
+    ax.plot(x, pla.Te, 'b-')
+    ax.plot(x, pla.Ti, 'r-')
+    ax.legend(['Te', 'Ti'])
+    ax.set_xlabel('Position (m)')
+    ax.set_ylabel('Temperature (eV)')
+    plt.show()
+
+
+def plot_pot(pla):
+    """Plot potential, E-field."""
+    x = pla.geom.x
+    fig, axes = plt.subplots(1, 2, figsize=(8, 4),
+                             constrained_layout=True)
+    # plot potential
+    ax = axes[0]
+    ax.plot(x, pla.pot, 'y-')
+    ax.legend(['Potential'])
+    # plot E-field
+    ax = axes[1]
+    ax.plot(x, pla.ef, 'g-')
+    ax.legend(['E-field'])
+    plt.show()
+
+
+def plot_transp_coeff(txp, pla):
+    """
+    Plot transp coeff.
+
+    pla: Plasma_1d object
+        use pla.geom.x for plot
+    """
+    x = pla.geom.x
+    fig, axes = plt.subplots(1, 2, figsize=(8, 4),
+                             constrained_layout=True)
+    # plot potential
+    ax = axes[0]
+    ax.plot(x, txp.De, 'bo-')
+    ax.plot(x, txp.Di, 'ro-')
+    ax.legend(['e Diffusion Coeff', 'Ion Diffusion Coeff'])
+    # plot E-field
+    ax = axes[1]
+    ax.plot(x, txp.Mue, 'bo-')
+    ax.plot(x, txp.Mui, 'ro-')
+    ax.legend(['e Mobility', 'Ion Mobility'])
+    plt.show()
+
+
+def plot_flux(txp, pla):
+    """
+    Plot flux and dflux.
+
+    pla: Plasma_1d object
+        use pla.geom.x for plot
+    """
+    x = pla.geom.x
+    fig, axes = plt.subplots(1, 2, figsize=(8, 4),
+                             constrained_layout=True)
+    # plot potential
+    ax = axes[0]
+    ax.plot(x, txp.fluxe, 'bo-')
+    ax.plot(x, txp.fluxi, 'ro-')
+    ax.legend(['e flux', 'Ion flux'])
+    # plot E-field
+    ax = axes[1]
+    ax.plot(x, txp.dfluxe, 'bo-')
+    ax.plot(x, txp.dfluxi, 'ro-')
+    ax.legend(['e dflux', 'Ion dflux'])
+    # show fig
+    plt.show()
+
+
+def plot_Te(een, pla):
+    """
+    Plot eon temperature.
+
+    pla: Plasma_1d object
+        use pla.geom.x for plot
+    """
+    x = pla.geom.x
+    fig, axes = plt.subplots(1, 2, figsize=(8, 4),
+                             constrained_layout=True)
+    # plot eon temperature
+    ax = axes[0]
+    ax.plot(x, een.Te, 'bo-')
+    ax.legend(['e Temperature'])
+    #
+    ax = axes[1]
+    ax.plot(x, een.Te, 'bo-')
+    ax.legend(['e Temperature'])
+    plt.show()
@@ -6,14 +6,20 @@ Power_1d contains:
     d(3/2nekTe)/dt = -dQ/dx + Power_in(ext.) - Power_loss(react)
     Input: ne, Te from Plasma1d, E_ext from field solver
     Output: Te
-"""
-
 
-from Constants import KB_EV, EON_MASS, UNIT_CHARGE
+RFPower_1d contains:
+    RF (CCP) power deposition, time average = pwr
+        ohmic heating of the bulk, ~ sin^2(wt)
+        stochastic heating at the sheath edges,
+            left sheath in one half cycle, right in the other
+    cycle-resolved: deposition at the RF phase of t,
+        dt has to resolve the period, e.g. period/nphase
+    cycle-averaged: precomputed phase-averaged deposition,
+        dt of the transport time scale
+    see PSS_1d to reach the RF-periodic steady state
+"""
 
 import numpy as np
-import matplotlib.pyplot as plt
-from copy import deepcopy
 
 
 class Power_1d(object):
@@ -27,15 +33,129 @@ class Power_1d(object):
         
     def __str__(self):
         """Print eon energy module."""
-        return f'label = {self.qdfluxe}'
+        return f'label = {self.input}'
     
-    def calc_pwr_in(self, pla):
+    def calc_pwr_in(self, pla, pwr=1.0, t=None):
         """
-        Calc thermal conduction coefficient.
+        Calc power input.
 
         pla: Plasma_1d object
-             calc uses pla.Te,i and pla.coll_em
-        heat_cond_e: W/m/K, heat conductivity for eon
+        pwr: W/m^3, uniform power density,
+             a 1d array of n_cases values in batch mode
+        t: s, time, unused, the power is steady
+        """
+        # calc uniform power input
+        self.input = np.ones_like(pla.ne)*pla.bcast(pwr)
+
+
+class RFPower_1d(Power_1d):
+    """
+    Calc the RF power deposition of a CCP.
+
+    Power_in(x, t) = pwr*(ohmic(t) + stoc(x, t)), time average pwr
+    ohmic = (1 - frac_st)*2*sin^2(wt), uniform
+    stoc = frac_st*2*max(+-sin(wt), 0)^2*edge(x),
+           edge: Gaussian at the left/right sheath edge, mean 1
+    Output: self.input, W/m^3
+    """
+
+    def __init__(self, pla, freq=13.56e6, mode='avg', nphase=32,
+                 frac_st=0.5, w_sh=5e-3):
+        """
+        Init the RF power deposition.
+
+        freq: Hz, RF frequency
+        mode: 'cycle' - cycle-resolved, 'avg' - cycle-averaged
+        nphase: number of phases of the precomputed table
+        frac_st: fraction of stochastic (sheath) heating
+        w_sh: m, sheath width, stochastic heating peaks at the
+              sheath edge, w_sh from the wall
+        """
+        if mode not in ('cycle', 'avg'):
+            raise ValueError(f"mode must be 'cycle' or 'avg', got {mode}")
+        super().__init__(pla)
+        self.freq, self.mode, self.nphase = freq, mode, nphase
+        self.period = 1.0/freq
+        self.frac_st, self.w_sh = frac_st, w_sh
+        self.init_table(pla.geom)
+
+    def __str__(self):
+        """Print RF power deposition."""
+        res = 'RFPower_1d:'
+        res += f'\nfreq = {self.freq} Hz, mode = {self.mode}'
+        res += f'\nnphase = {self.nphase}, frac_st = {self.frac_st}'
+        return res
+
+    def calc_shape(self, x, phase):
+        """
+        Calc the deposition at an RF phase, time average = 1.
+
+        phase: rad, array of phases
+        output: array (nphase, nx)
+        """
+        sin = np.sin(phase)[:, np.newaxis]
+        x0, x1 = x[0] + self.w_sh, x[-1] - self.w_sh
+        res = (1.0 - self.frac_st)*2.0*sin**2*np.ones_like(x)
+        for xc, sgn in ((x0, 1.0), (x1, -1.0)):
+            edge = np.exp(-((x - xc)/(0.5*self.w_sh))**2)
+            edge /= np.trapezoid(edge, x)/(x[-1] - x[0])
+            # half of the stochastic heating, in its half cycle
+            res += self.frac_st*2.0*np.maximum(sgn*sin, 0.0)**2*edge
+        return res
+
+    def init_table(self, geom):
+        """Precompute the phase table and its cycle average."""
+        self.geom = geom
+        phase = 2.0*np.pi*np.arange(self.nphase)/self.nphase
+        self.table = self.calc_shape(geom.x, phase)
+        self.avg = self.table.mean(axis=0)
+
+    def calc_phase(self, t):
+        """Return the deposition at time t, linear in the phase table."""
+        frac = (t/self.period % 1.0)*self.nphase
+        i0 = int(frac)
+        w = frac - i0
+        return ((1.0 - w)*self.table[i0 % self.nphase]
+                + w*self.table[(i0 + 1) % self.nphase])
+
+    def calc_pwr_in(self, pla, pwr=1.0, t=None):
+        """
+        Calc power input.
+
+        pwr: W/m^3, time and volume averaged power density,
+             a 1d array of n_cases values in batch mode
+        t: s, time of the RF phase in 'cycle' mode,
+           None - the cycle average
         """
-        # calc thermal conductivity for eon
-        self.input = np.ones_like(pla.ne)*1.0
\ No newline at end of file
+        if self.geom is not pla.geom:
+            self.init_table(pla.geom)
+        shape = (self.avg if self.mode == 'avg' or t is None
+                 else self.calc_phase(t))
+        if self.input.shape != pla.ne.shape:
+            self.input = np.empty_like(pla.ne)
+        np.multiply(shape, pla.bcast(pwr), out=self.input)
+
+
+if __name__ == '__main__':
+    """Test RFPower_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    import matplotlib.pyplot as plt
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=101)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    rf1d = RFPower_1d(pla1d, mode='cycle', nphase=16)
+    print(rf1d)
+    ts = np.arange(16)*rf1d.period/16
+    inputs = []
+    for t in ts:
+        rf1d.calc_pwr_in(pla1d, 1.0, t=t)
+        inputs.append(rf1d.input.copy())
+    avg = np.mean(inputs, axis=0)
+    print('max |mean(cycle) - avg| =', np.abs(avg - rf1d.avg).max())
+    print('volume average =', np.trapezoid(avg, mesh1d.x)/10e-2)
+    for t, pwr_in in zip(ts[::4], inputs[::4]):
+        plt.plot(mesh1d.x, pwr_in, label=f'{t/rf1d.period:.2f} period')
+    plt.plot(mesh1d.x, rf1d.avg, 'k--', label='cycle average')
+    plt.legend()
+    plt.show()
@@ -0,0 +1,206 @@
+"""
+1D Plasma Profiling Module
+
+Prof_1d contains:
+    opt-in instrumentation, wraps methods of module objects in place
+        default: calc_transp_coeff, calc_ambi, calc_diff, calc_dd,
+                 den_evolve, bndy_plasma, limit_plasma, calc_th_flux,
+                 calc_Te, bndy_Te, cnt_diff, cnt_diff_2nd
+        unwrap restores the methods, no overhead when not wrapped
+    per stage: calls, total and self wall time,
+               temporary memory (peak above entry, with tracemalloc)
+    steps/second from tick(), live report every N steps
+    dump as JSON and as collapsed stacks ('a;b;c <us>'),
+        the input format of flamegraph.pl and speedscope
+"""
+
+import functools
+import json
+import logging
+import time
+import tracemalloc
+
+log = logging.getLogger(__name__)
+
+METHODS = ('calc_transp_coeff', 'calc_ambi', 'calc_diff', 'calc_dd',
+           'den_evolve', 'bndy_plasma', 'limit_plasma', 'calc_th_flux',
+           'calc_Te', 'bndy_Te', 'cnt_diff', 'cnt_diff_2nd')
+ALLOC_MIN = 1024  # bytes, a call allocating more counts as allocating
+
+
+class Prof_1d(object):
+    """Define the profiler."""
+
+    def __init__(self, alloc=False, every=None):
+        """
+        Init the profiler.
+
+        alloc: trace memory of temporaries, tracemalloc is slow
+        every: log a live report every N ticks, None - no live report
+        """
+        self.alloc, self.every = alloc, every
+        self.stats = {}  # stage -> calls, time, self, alloc, nalloc
+        self.stacks = {}  # 'a;b;c' -> self time
+        self.stack = []  # [name, t0, child time, mem0, peak]
+        self.wrapped = []  # (obj, name)
+        self.nstep = 0
+        self.t0 = time.perf_counter()
+        self.started = alloc and not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+
+    def __str__(self):
+        """Print the report, stages sorted by total time."""
+        wall = time.perf_counter() - self.t0
+        res = 'Prof_1d:'
+        res += f'\nsteps = {self.nstep}, wall = {wall:.3f} s'
+        if self.nstep:
+            res += f', {self.nstep/wall:.1f} steps/s'
+        res += (f"\n{'stage':28s}{'calls':>10s}{'total s':>11s}"
+                f"{'self s':>11s}{'us/call':>11s}")
+        if self.alloc:
+            res += f"{'alloc MB':>11s}{'n alloc':>9s}"
+        for name, st in sorted(self.stats.items(),
+                               key=lambda item: -item[1]['time']):
+            res += (f"\n{name:28s}{st['calls']:10d}{st['time']:11.4f}"
+                    f"{st['self']:11.4f}{st['time']/st['calls']*1e6:11.2f}")
+            if self.alloc:
+                res += f"{st['alloc']/1e6:11.3f}{st['nalloc']:9d}"
+        return res
+
+    def wrap(self, obj, names=METHODS, label=None):
+        """
+        Wrap methods of an object.
+
+        names: methods to wrap, the missing ones are ignored
+        label: prefix of the stage names, default class name
+        """
+        label = label or type(obj).__name__
+        for name in names:
+            func = getattr(obj, name, None)
+            if func is None or name in vars(obj):
+                continue
+            setattr(obj, name, self.timed(f'{label}.{name}', func))
+            self.wrapped.append((obj, name))
+
+    def unwrap(self):
+        """Restore all wrapped methods, stop tracemalloc if started."""
+        for obj, name in self.wrapped:
+            delattr(obj, name)
+        self.wrapped = []
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    def timed(self, stage, func):
+        """Return func wrapped to record one stage."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.enter(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.exit()
+        return wrapper
+
+    def enter(self, stage):
+        """Start a stage."""
+        mem0 = peak = 0
+        if self.alloc:
+            mem0, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                # keep the parent's peak before resetting it
+                self.stack[-1][4] = max(self.stack[-1][4], peak)
+            tracemalloc.reset_peak()
+            peak = mem0
+        self.stack.append([stage, time.perf_counter(), 0.0, mem0, peak])
+
+    def exit(self):
+        """End the innermost stage."""
+        stage, t0, tchild, mem0, peak = self.stack[-1]
+        dt = time.perf_counter() - t0
+        path = ';'.join(frame[0] for frame in self.stack)
+        self.stack.pop()
+        st = self.stats.setdefault(stage, dict(calls=0, time=0.0, self=0.0,
+                                               alloc=0, nalloc=0))
+        st['calls'] += 1
+        st['time'] += dt
+        st['self'] += dt - tchild
+        self.stacks[path] = self.stacks.get(path, 0.0) + dt - tchild
+        if self.alloc:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            st['alloc'] += peak - mem0
+            st['nalloc'] += peak - mem0 > ALLOC_MIN
+        if self.stack:
+            self.stack[-1][2] += dt
+            self.stack[-1][4] = max(self.stack[-1][4], peak)
+
+    def tick(self):
+        """Count one step, log the live report every N steps."""
+        self.nstep += 1
+        if self.every and not self.nstep % self.every:
+            log.info('%s', self)
+
+    def dump(self, fname):
+        """Save stats as JSON."""
+        wall = time.perf_counter() - self.t0
+        with open(fname, 'w') as f:
+            json.dump(dict(steps=self.nstep, wall=wall,
+                           steps_per_s=self.nstep/wall if wall else 0.0,
+                           stages=self.stats), f, indent=1)
+
+    def dump_stacks(self, fname):
+        """Save collapsed stacks, self time in us, for flame graphs."""
+        with open(fname, 'w') as f:
+            for path, t in sorted(self.stacks.items()):
+                f.write(f'{path} {int(round(t*1e6))}\n')
+
+
+if __name__ == '__main__':
+    """Test Prof_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Eergy import Eergy_1d
+    logging.basicConfig(level=logging.INFO)
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    een1d = Eergy_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    pwr1d.calc_pwr_in(pla1d)
+
+    def run(niter):
+        t0 = time.perf_counter()
+        for itn in range(niter):
+            txp1d.calc_ambi(pla1d)
+            pla1d.den_evolve(1e-6, txp1d, src1d)
+            pla1d.bndy_plasma()
+            pla1d.limit_plasma()
+            een1d.calc_th_cond_coeff(pla1d)
+            een1d.calc_th_flux(pla1d, txp1d)
+            een1d.calc_Te(1e-7, pla1d, pwr1d)
+            een1d.bndy_Te()
+            prof.tick()
+        return time.perf_counter() - t0
+
+    prof = Prof_1d()
+    t_off = run(2000)
+    for alloc in (False, True):
+        prof = Prof_1d(alloc=alloc, every=1000)
+        for obj in (pla1d, txp1d, een1d, mesh1d):
+            prof.wrap(obj)
+        t_on = run(2000)
+        prof.unwrap()
+        print(prof)
+        print(f'not wrapped {t_off:.3f} s, wrapped {t_on:.3f} s, '
+              f'alloc = {alloc}')
+    prof.dump('prof.json')
+    prof.dump_stacks('prof.stacks')
+    prof = Prof_1d()
+    t_off = run(2000)
+    print(f'after unwrap {t_off:.3f} s')
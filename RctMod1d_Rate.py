@@ -0,0 +1,179 @@
+"""
+1D Plasma Rate Coefficient Table Module
+
+Rate_1d contains:
+    tables of k(Te) for a reaction set, on a log-spaced Te grid
+        Arrhenius: (equation, A, n, Ea), k = A * Te^n * exp(-Ea/Te)
+        cross section: (equation, (eps, sigma)), eps in eV, sigma in m^2
+            integrated over a Maxwellian eon energy distribution
+    vectorized interpolation of log(k) in log(Te), all reactions at once
+    tables stored as rate_<hash>.npz, the hash is taken over
+        the reaction set and the Te grid, so a changed set is rebuilt
+        the hash is stored too and checked on load, see calc_key
+    Input: Te from Plasma_1d
+    Output: k of all reactions, shape (n_reactions,) + Te.shape
+"""
+
+from Constants import UNIT_CHARGE, EON_MASS
+
+import hashlib
+import json
+import os
+import numpy as np
+
+K_MIN = 1e-300  # floor of k, keeps log(k) finite
+
+
+def calc_k_maxwell(eps, sigma, Te, nu=4000, umax=60.0):
+    """
+    Calc k(Te) from a cross section over a Maxwellian.
+
+    k = sqrt(8e/(pi*m)) * Te^(-3/2) * int(sigma * eps * exp(-eps/Te))
+      = sqrt(8e*Te/(pi*m)) * int(sigma(u*Te) * u * exp(-u)), u = eps/Te
+    eps: eV, energy of the cross section points, ascending
+    sigma: m^2, cross section, 0 outside the given energies
+    Te: eV, array of eon temperatures
+    output: m^3/s, k of shape Te.shape
+    """
+    Te = np.asarray(Te, dtype=float)
+    u = np.linspace(0.0, umax, nu)
+    sig = np.interp(Te[..., np.newaxis]*u, eps, sigma, left=0.0, right=0.0)
+    integ = np.trapezoid(sig*u*np.exp(-u), u, axis=-1)
+    return np.sqrt(8.0*UNIT_CHARGE*Te/(np.pi*EON_MASS))*integ
+
+
+def calc_key(rcts, Te_min, Te_max, nTe):
+    """Calc the content hash of a reaction set and Te grid."""
+    rcts = [[rct[0]] + [np.asarray(par, dtype=float).tolist()
+                        for par in rct[1:]]
+            for rct in rcts]
+    text = json.dumps([rcts, Te_min, Te_max, nTe])
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class Rate_1d(object):
+    """Define the rate coefficient table."""
+
+    def __init__(self, rcts, Te_min=0.01, Te_max=100.0, nTe=400, path=None):
+        """
+        Build or load the table.
+
+        rcts: list of reactions, see module doc
+        Te_min, Te_max: eV, range of the table, Te is clipped to it
+        nTe: number of Te points, log-spaced
+        path: directory of the stored tables, None - not stored
+        """
+        self.rcts = list(rcts)
+        self.Te_min, self.Te_max, self.nTe = Te_min, Te_max, nTe
+        self.lnTe0 = np.log(Te_min)
+        self.dlnTe = (np.log(Te_max) - self.lnTe0)/(nTe - 1)
+        self.Te = np.exp(self.lnTe0 + self.dlnTe*np.arange(nTe))
+        self.key = calc_key(self.rcts, Te_min, Te_max, nTe)
+        self.fname = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self.fname = os.path.join(path, f'rate_{self.key}.npz')
+        self.lnk = self.load() if self.fname else None
+        self.loaded = self.lnk is not None
+        if not self.loaded:
+            self.lnk = self.build()
+            if self.fname:
+                self.save()
+
+    def __str__(self):
+        """Print rate table."""
+        res = 'Rate_1d:'
+        res += f'\nreactions = {len(self.rcts)}'
+        res += f'\nTe = {self.Te_min} - {self.Te_max} eV, {self.nTe} points'
+        res += f'\nkey = {self.key}'
+        res += f'\nfile = {self.fname}, loaded = {self.loaded}'
+        return res
+
+    def build(self):
+        """Calc log(k) of all reactions on the Te grid."""
+        lnk = np.empty((len(self.rcts), self.nTe))
+        for j, rct in enumerate(self.rcts):
+            if len(rct) == 2:
+                eps, sigma = rct[1]
+                k = calc_k_maxwell(eps, sigma, self.Te)
+            else:
+                A, n, Ea = rct[1:4]
+                k = A*self.Te**n*np.exp(-Ea/self.Te)
+            lnk[j] = np.log(np.maximum(k, K_MIN))
+        return lnk
+
+    def load(self):
+        """
+        Load the stored table.
+
+        output: log(k), None if not stored, or stored under
+                another hash, then rebuilt
+        """
+        if not os.path.exists(self.fname):
+            return None
+        with np.load(self.fname) as data:
+            if str(data['key']) != self.key:
+                return None
+            return data['lnk']
+
+    def save(self):
+        """Store the table, written to a temp file and renamed."""
+        tmp = self.fname[:-4] + '.tmp.npz'
+        np.savez(tmp, lnk=self.lnk, Te=self.Te, key=self.key)
+        os.replace(tmp, self.fname)
+
+    def calc_k(self, Te, out=None):
+        """
+        Interpolate k of all reactions.
+
+        Te: eV, any shape, clipped to the table range
+        out: optional array (n_reactions,) + Te.shape to write k into
+        output: m^3/s, k
+        """
+        s = (np.log(np.clip(Te, self.Te_min, self.Te_max)) -
+             self.lnTe0)/self.dlnTe
+        idx = np.minimum(s.astype(int), self.nTe - 2)
+        w = s - idx
+        k = np.multiply(self.lnk[:, idx], 1.0 - w, out=out)
+        k += self.lnk[:, idx + 1]*w
+        return np.exp(k, out=k)
+
+
+if __name__ == '__main__':
+    """Test Rate_1d."""
+    import tempfile
+    import time
+    from RctMod1d_React import REACT_AR
+    Te = np.linspace(0.5, 10.0, 1001)
+    rate = Rate_1d(REACT_AR)
+    k = rate.calc_k(Te)
+    for j, (eqn, A, n, Ea) in enumerate(REACT_AR):
+        k0 = A*Te**n*np.exp(-Ea/Te)
+        print(f'{eqn:28s} max rel error = {np.max(np.abs(k[j]/k0 - 1)):.2e}')
+    # constant cross section, k = sigma * mean speed
+    sigma0 = 1e-19
+    eps = np.array([0.0, 1e4])
+    rate = Rate_1d([('e + Ar -> e + Ar', (eps, [sigma0, sigma0]))])
+    k0 = sigma0*np.sqrt(8.0*UNIT_CHARGE*Te/(np.pi*EON_MASS))
+    print('Maxwellian, max rel error =',
+          np.max(np.abs(rate.calc_k(Te)[0]/k0 - 1)))
+    # store, a second build loads the table
+    with tempfile.TemporaryDirectory() as path:
+        rcts = [('e + Ar -> 2e + Ar+', 2.34e-14, 0.59, Ea)
+                for Ea in np.linspace(1.0, 20.0, 300)]
+        t0 = time.perf_counter()
+        rate = Rate_1d(rcts, path=path)
+        t1 = time.perf_counter()
+        rate = Rate_1d(rcts, path=path)
+        t2 = time.perf_counter()
+        print(rate)
+        print(f'build {t1 - t0:.3e} s, load {t2 - t1:.3e} s')
+        Te = np.linspace(0.5, 10.0, 1001)
+        t0 = time.perf_counter()
+        k = rate.calc_k(Te)
+        t1 = time.perf_counter()
+        A, n, Ea = [np.array([rct[i] for rct in rcts])[:, np.newaxis]
+                    for i in (1, 2, 3)]
+        k0 = A*Te**n*np.exp(-Ea/Te)
+        t2 = time.perf_counter()
+        print(f'table {t1 - t0:.3e} s, direct {t2 - t1:.3e} s')
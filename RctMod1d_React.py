@@ -1,33 +1,286 @@
 """
-1D Plasma Transport Module
+1D Plasma Reaction Module
 
-Transp_1d contains:
-    Diffusion only
-    Ambipolar
-    Drfit-Diffusion
-    Momentum Solver
-
-    Continuity Eq. dn/dt = -dF/dx * dt + S * det
-    Input: depends on transport mode
-    Output: dF/dx for continuity equation.
+React_1d contains:
+    Reaction set, a list of (equation, A, n, Ea)
+        e.g. ('e + Ar -> 2e + Ar+', 2.34e-14, 0.59, 17.44)
+        k(Te) = A * Te^n * exp(-Ea/Te), Te in eV
+        or interpolated from a Rate_1d table, see RctMod1d_Rate
+    compiled once into
+        stoichiometry matrix N: (n_species, n_reactions), net coeff
+        reactant index array, padded with a unit 'density'
+    Source of all species on all nodes in one vectorized pass
+        S = N . (k(Te) * prod(n_reactants))
+    Input: ne, ni, nn, Te from Plasma_1d
+           species not in Plasma_1d are held here, see React_1d.den
+    Output: se, si and src for all species
+    Implicit chemistry, chem_step, backward Euler on every node
+        Newton with the analytic Jacobian dS/dn, one small dense
+        system per node, all nodes in one batched solve
+        used operator split from transport, see Plasma_1d.den_evolve
 """
 
-from Constants import KB_EV, EON_MASS, UNIT_CHARGE
+from RctMod1d_Rate import calc_key
 
+import re
 import numpy as np
-import matplotlib.pyplot as plt
-from copy import deepcopy
+
+# species held by Plasma_1d, species name -> variable name
+SPCS = {'e': 'ne', 'Ar+': 'ni', 'Ar': 'nn'}
+
+# Ar set, k in m^3/s, Ea in eV
+REACT_AR = [
+    ('e + Ar -> 2e + Ar+', 2.34e-14, 0.59, 17.44),  # ionization
+    ('e + Ar -> e + Ar*', 5.0e-15, 0.74, 11.56),  # excitation
+    ('e + Ar* -> 2e + Ar+', 6.8e-15, 0.67, 4.20),  # step ionization
+    ('e + Ar* -> e + Ar', 2.0e-13, 0.0, 0.0),  # quenching
+    ('Ar* + Ar* -> e + Ar+ + Ar', 6.2e-16, 0.0, 0.0),  # pooling
+]
+
+
+def parse_eqn(eqn):
+    """
+    Parse a reaction equation.
+
+    'e + Ar -> 2e + Ar+' -> ({'e': 1, 'Ar': 1}, {'e': 2, 'Ar+': 1})
+    Terms are separated by ' + ', a leading integer is the coeff.
+    """
+    sides = []
+    for side in eqn.split('->'):
+        terms = {}
+        for term in side.split():
+            if term == '+':
+                continue
+            coeff, name = re.match(r'^(\d*)(.+)$', term).groups()
+            terms[name] = terms.get(name, 0) + int(coeff or 1)
+        sides.append(terms)
+    return tuple(sides)
 
 
 class React_1d(object):
-    """Define the base tranport module/object."""
-    
-    def __init__(self, pla):
-        """Import geometry information."""
-        nx = pla.geom.nx
-        self.se = np.zeros(nx)  # initial eon flux
-        self.si = np.zeros(nx)  # initial ion flux
-        
+    """Define the reaction module/object."""
+
+    def __init__(self, pla, rcts=(), spcs=SPCS, table=None):
+        """
+        Compile the reaction set.
+
+        rcts: list of (equation, A, n, Ea), see module doc
+        spcs: dict, species name -> Plasma_1d variable name
+              other species in rcts are held in self.den, init to 0
+        table: Rate_1d of the same rcts, k(Te) is interpolated from it,
+               needed for reactions given by cross sections,
+               built from the same rcts (equal hash, see Rate_1d)
+        """
+        self.rcts = list(rcts)
+        self.table = table
+        eqns = [parse_eqn(rct[0]) for rct in self.rcts]
+        # species: Plasma_1d ones first, then in order of appearance
+        names = [name for name in spcs
+                 if any(name in lhs or name in rhs for lhs, rhs in eqns)]
+        for lhs, rhs in eqns:
+            names += [name for name in {**lhs, **rhs} if name not in names]
+        self.species = names
+        self.spcs = {name: spcs[name] for name in names if name in spcs}
+        nsp, nrct = len(names), len(self.rcts)
+        # stoichiometry, net coeff of each species in each reaction
+        self.stoic = np.zeros((nsp, nrct))
+        order = max([sum(lhs.values()) for lhs, rhs in eqns] + [1])
+        # reactant index, padded with the unit row nsp
+        self.ridx = np.full((nrct, order), nsp)
+        # d(prod n)/dn_j of each reactant slot, onehot[p, r, j]
+        self.onehot = np.zeros((order, nrct, nsp + 1))
+        for j, (lhs, rhs) in enumerate(eqns):
+            idx = [names.index(name) for name, c in lhs.items()
+                   for _ in range(c)]
+            self.ridx[j, :len(idx)] = idx
+            self.onehot[np.arange(order), j, self.ridx[j]] = 1.0
+            for name, c in lhs.items():
+                self.stoic[names.index(name), j] -= c
+            for name, c in rhs.items():
+                self.stoic[names.index(name), j] += c
+        # N_ir * onehot[p, r, j], contracted with drate in calc_jac
+        self.dstoic = self.stoic[np.newaxis, :, :, np.newaxis]*\
+            self.onehot[:, np.newaxis]
+        # rate law arrays, broadcast against Te
+        if table is None:
+            shape = (nrct,) + (1,)*pla.ne.ndim
+            self.A, self.n, self.Ea = [
+                np.reshape([rct[i] for rct in self.rcts], shape)
+                for i in (1, 2, 3)]
+        elif table.key != calc_key(self.rcts, table.Te_min, table.Te_max,
+                                   table.nTe):
+            raise ValueError('React_1d: table does not match the reactions')
+        # densities of all species plus the unit row, and sources
+        self.den = np.zeros((nsp + 1,) + pla.ne.shape)
+        self.den[nsp] = 1.0
+        self.src = np.zeros((nsp,) + pla.ne.shape)
+        self.k = np.zeros((nrct,) + pla.ne.shape)
+        self.rate = np.zeros((nrct,) + pla.ne.shape)
+        self.seen = None
+        # se, si are views of src if e, ion take part in reactions
+        self.se, self.si = np.zeros_like(pla.ne), np.zeros_like(pla.ne)
+        for name, var in self.spcs.items():
+            if var == 'ne':
+                self.se = self.src[names.index(name)]
+            elif var == 'ni':
+                self.si = self.src[names.index(name)]
+
     def __str__(self):
-        """Print Transport Module."""
-        return f'label = {self.dfluxe}'
\ No newline at end of file
+        """Print reaction module."""
+        res = 'React_1d:'
+        res += f'\nspecies = {self.species}'
+        res += f'\nreactions = {len(self.rcts)}'
+        for rct in self.rcts:
+            res += f'\n    {rct[0]}'
+        return res
+
+    def calc_rate_coeff(self, pla):
+        """
+        Calc k(Te) of all reactions, cached on Plasma_1d and Te version.
+
+        k = A * Te^n * exp(-Ea/Te), or from the table
+        """
+        key = (id(pla),) + pla.vers(('Te',))
+        if key == self.seen:
+            return
+        self.seen = key
+        if self.table is not None:
+            self.table.calc_k(pla.Te, out=self.k)
+            return
+        np.power(pla.Te, self.n, out=self.k)
+        self.k *= self.A
+        self.k *= np.exp(-self.Ea/pla.Te)
+
+    def gather(self, pla):
+        """Copy the densities of the Plasma_1d species to self.den."""
+        for name, var in self.spcs.items():
+            self.den[self.species.index(name)] = getattr(pla, var)
+
+    def scatter(self, pla):
+        """Copy self.den back to Plasma_1d and mark the variables."""
+        for name, var in self.spcs.items():
+            getattr(pla, var)[...] = self.den[self.species.index(name)]
+        pla.touch(*self.spcs.values())
+
+    def calc_rate(self):
+        """Calc rate and src from self.den and self.k."""
+        np.prod(self.den[self.ridx], axis=1, out=self.rate)
+        self.rate *= self.k
+        self.src[...] = np.tensordot(self.stoic, self.rate, axes=1)
+
+    def calc_src(self, pla):
+        """
+        Calc the source of all species.
+
+        rate = k(Te) * prod(n_reactants)
+        src = N . rate, se and si are updated with src
+        """
+        self.gather(pla)
+        self.calc_rate_coeff(pla)
+        self.calc_rate()
+
+    def calc_jac(self):
+        """
+        Calc the Jacobian of the sources on every node.
+
+        dS_i/dn_j = sum_r N_ir * k_r * d(prod n_reactants)_r/dn_j
+        output: array (n_species, n_species) + node shape
+        """
+        nsp = len(self.species)
+        dens = self.den[self.ridx]
+        jac = 0.0
+        for p in range(self.ridx.shape[1]):
+            # k times the product of the other reactants
+            drate = self.k*np.prod(np.delete(dens, p, axis=1), axis=1)
+            jac = jac + np.tensordot(self.dstoic[p], drate, axes=([1], [0]))
+        return jac[:, :nsp]
+
+    def chem_step(self, delt, pla, tol=1e-8, maxiter=20):
+        """
+        Integrate the sources over delt implicitly on every node.
+
+        n - n0 - dt*S(n) = 0 (backward Euler), by Newton
+        (I - dt*dS/dn) dn = n0 + dt*S(n) - n
+        Te is frozen over the step, densities stay >= 0.
+        Densities of Plasma_1d species are updated and touched.
+        tol: on |dn|/n of all species and nodes
+        output: number of Newton iterations
+        """
+        self.gather(pla)
+        self.calc_rate_coeff(pla)
+        nsp = len(self.species)
+        den = self.den[:nsp]
+        n0 = den.copy()
+        eye = np.eye(nsp).reshape((nsp, nsp) + (1,)*(den.ndim - 1))
+        for itn in range(1, maxiter + 1):
+            self.calc_rate()
+            res = n0 + delt*self.src - den
+            jac = eye - delt*self.calc_jac()
+            # one (nsp, nsp) system per node, nodes as the batch axes
+            dn = np.linalg.solve(np.moveaxis(jac, (0, 1), (-2, -1)),
+                                 np.moveaxis(res, 0, -1)[..., np.newaxis])
+            dn = np.moveaxis(dn[..., 0], -1, 0)
+            den += dn
+            np.maximum(den, 0.0, out=den)
+            if np.all(np.abs(dn) <= tol*den + 1.0):
+                break
+        self.scatter(pla)
+        return itn
+
+
+if __name__ == '__main__':
+    """Test React_1d."""
+    import time
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma(Te=3.0)
+    src1d = React_1d(pla1d, REACT_AR)
+    print(src1d)
+    src1d.den[src1d.species.index('Ar*')] = 1e15
+    src1d.calc_src(pla1d)
+    # check against the ionization rates written out by hand
+    ne, nn, nm, Te = pla1d.ne, pla1d.nn, 1e15, pla1d.Te
+    k = [A*Te**n*np.exp(-Ea/Te) for eqn, A, n, Ea in REACT_AR]
+    si = k[0]*ne*nn + k[2]*ne*nm + k[4]*nm*nm
+    print('max error of si:', np.max(np.abs(src1d.si - si)/si))
+    print('max error of se - si:', np.max(np.abs(src1d.se - src1d.si)/si))
+    # the same set from a rate table
+    from RctMod1d_Rate import Rate_1d
+    src1d = React_1d(pla1d, REACT_AR, table=Rate_1d(REACT_AR))
+    src1d.den[src1d.species.index('Ar*')] = 1e15
+    src1d.calc_src(pla1d)
+    print('max error of si, table:', np.max(np.abs(src1d.si - si)/si))
+    # stiff recombination, n = n0/(1 + k*n0*t) with ne = ni
+    # stable at k*n0*dt = 10, backward Euler is first order
+    src1d = React_1d(pla1d, [('e + Ar+ -> Ar', 1e-12, 0.0, 0.0)])
+    pla1d.init_plasma(ne=1e17, Te=3.0)
+    n0, dt = pla1d.ne[25], 1e-4  # k*n0*dt = 1e1
+    for itn in range(100):
+        src1d.chem_step(dt, pla1d)
+    n = n0/(1.0 + 1e-12*n0*dt*100)
+    print('recombination, error =', abs(pla1d.ne[25]/n - 1.0))
+    # scaling, 300 reactions between 30 species
+    rng = np.random.default_rng(0)
+    names = ['e', 'Ar+', 'Ar'] + [f'X{i}' for i in range(27)]
+    rcts = []
+    for j in range(300):
+        lhs, rhs = rng.choice(names, 2), rng.choice(names, 3)
+        rcts.append((' + '.join(lhs) + ' -> ' + ' + '.join(rhs),
+                     1e-15, 0.5, rng.uniform(0.0, 10.0)))
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=1001)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma(Te=3.0)
+    src1d = React_1d(pla1d, rcts)
+    t0 = time.perf_counter()
+    for itn in range(100):
+        pla1d.touch('Te')
+        src1d.calc_src(pla1d)
+    print(f'{len(src1d.species)} species, {len(rcts)} reactions, '
+          f'nx = {mesh1d.nx}: '
+          f'{(time.perf_counter() - t0)/100*1e3:.2f} ms per call')
+    t0 = time.perf_counter()
+    itn = src1d.chem_step(1e-6, pla1d)
+    print(f'chem_step: {itn} iterations, '
+          f'{(time.perf_counter() - t0)*1e3:.2f} ms')
@@ -0,0 +1,187 @@
+"""
+1D Plasma Time History Module
+
+Record_1d contains:
+    snapshots of profiles, e.g. ne, ni, Te
+        every N steps and/or when a trigger fires
+        buffered in chunks, appended to <fname>.bin
+        layout in <fname>.json, read back with load_record
+    running reductions on every step, O(nx) memory
+        mean, min, max over steps
+        time average, weighted by dt
+        rms change between consecutive steps, the mean of the
+            squared change is kept, see calc_rms
+"""
+
+import json
+import os
+import numpy as np
+
+
+class Record_1d(object):
+    """Define the time history recorder."""
+
+    def __init__(self, fname, fields=('ne', 'ni', 'Te'), every=100,
+                 trigger=None, chunk=64):
+        """
+        Init the recorder.
+
+        fname: file name without extension
+        fields: names of the recorded profiles
+        every: write a snapshot every N steps, None for trigger only
+        trigger: func(itn, t, data) -> bool, write a snapshot if True
+        chunk: number of snapshots buffered before writing
+        """
+        self.fname = fname
+        self.fields = tuple(fields)
+        self.every, self.trigger = every, trigger
+        self.chunk = chunk
+        self.buf = None  # allocated on the first record
+        self.nbuf, self.nsnap = 0, 0
+        self.nstep = 0
+        self.t0 = self.t = None
+
+    def __str__(self):
+        """Print recorder information."""
+        res = 'Record_1d:'
+        res += f'\nfile = {self.fname}.bin'
+        res += f'\nsteps = {self.nstep}, snapshots = {self.nsnap}'
+        return res
+
+    def init_record(self, t, data):
+        """Allocate the buffer and the reductions, write the layout."""
+        self.shape = {name: np.shape(data[name]) for name in self.fields}
+        self.size = {name: int(np.prod(self.shape[name]))
+                     for name in self.fields}
+        self.buf = np.empty((self.chunk, 2 + sum(self.size.values())))
+        with open(self.fname + '.json', 'w') as f:
+            json.dump(dict(fields=self.fields,
+                           shape=[self.shape[name] for name in self.fields]),
+                      f)
+        open(self.fname + '.bin', 'wb').close()
+        self.t0 = self.t = t
+        self.mean = {name: np.zeros(self.shape[name]) for name in self.fields}
+        self.tave = {name: np.zeros(self.shape[name]) for name in self.fields}
+        self.min = {name: np.array(data[name], dtype=float)
+                    for name in self.fields}
+        self.max = {name: np.array(data[name], dtype=float)
+                    for name in self.fields}
+        self.prev = {name: np.array(data[name], dtype=float)
+                     for name in self.fields}
+        self.msq = {name: np.zeros(self.shape[name]) for name in self.fields}
+
+    def record(self, itn, t, **data):
+        """
+        Record one step.
+
+        itn: step number
+        t: s, time
+        data: name=array for all fields
+        """
+        if self.buf is None:
+            self.init_record(t, data)
+        self.nstep += 1
+        dt = t - self.t
+        self.t = t
+        for name in self.fields:
+            y = data[name]
+            # running mean over steps
+            self.mean[name] += (y - self.mean[name])/self.nstep
+            np.minimum(self.min[name], y, out=self.min[name])
+            np.maximum(self.max[name], y, out=self.max[name])
+            # time average, trapezoidal in t
+            if t > self.t0:
+                self.tave[name] += (0.5*(y + self.prev[name]) -
+                                    self.tave[name])*dt/(t - self.t0)
+            else:
+                self.tave[name][...] = y
+            # mean squared change over the nstep - 1 changes
+            if self.nstep > 1:
+                self.msq[name] += ((y - self.prev[name])**2 -
+                                   self.msq[name])/(self.nstep - 1)
+            self.prev[name][...] = y
+        snap = self.every and not itn % self.every
+        if snap or (self.trigger and self.trigger(itn, t, data)):
+            self.snapshot(itn, t, data)
+
+    def calc_rms(self, name):
+        """Return the rms change between consecutive steps of a field."""
+        return np.sqrt(self.msq[name])
+
+    def snapshot(self, itn, t, data):
+        """Write one snapshot into the buffer."""
+        row = self.buf[self.nbuf]
+        row[0], row[1] = itn, t
+        ist = 2
+        for name in self.fields:
+            row[ist:ist + self.size[name]] = np.ravel(data[name])
+            ist += self.size[name]
+        self.nbuf += 1
+        self.nsnap += 1
+        if self.nbuf == self.chunk:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered snapshots to the file."""
+        if self.nbuf:
+            with open(self.fname + '.bin', 'ab') as f:
+                self.buf[:self.nbuf].tofile(f)
+            self.nbuf = 0
+
+    def close(self):
+        """Flush the buffer, call at the end of the run."""
+        self.flush()
+
+
+def load_record(fname):
+    """
+    Read the snapshots written by Record_1d, memory-mapped.
+
+    fname: file name without extension
+    output: dict of itn, t and one (nsnap, ...) array per field,
+            nsnap = 0 if no snapshot was written
+    """
+    with open(fname + '.json') as f:
+        head = json.load(f)
+    size = [int(np.prod(shape)) for shape in head['shape']]
+    reclen = 2 + sum(size)
+    if os.path.getsize(fname + '.bin'):
+        data = np.memmap(fname + '.bin', dtype=float, mode='r')
+        data = data.reshape(-1, reclen)
+    else:
+        # an empty file can not be memory-mapped
+        data = np.empty((0, reclen))
+    res = dict(itn=data[:, 0], t=data[:, 1])
+    ist = 2
+    for name, shape, nsize in zip(head['fields'], head['shape'], size):
+        res[name] = data[:, ist:ist + nsize].reshape([-1] + shape)
+        ist += nsize
+    return res
+
+
+if __name__ == '__main__':
+    """Test Record_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    rec = Record_1d('record_test', fields=('ne', 'ni'), every=300)
+    dt = 1e-6
+    niter = 3000
+    for itn in range(niter):
+        txp1d.calc_ambi(pla1d)
+        pla1d.den_evolve(dt, txp1d, src1d)
+        pla1d.bndy_plasma()
+        pla1d.limit_plasma()
+        rec.record(itn + 1, dt*(itn + 1), ne=pla1d.ne, ni=pla1d.ni)
+    rec.close()
+    print(rec)
+    print('max rms change of ne per step:', rec.calc_rms('ne').max())
+    hist = load_record('record_test')
+    for t, ne in zip(hist['t'], hist['ne']):
+        print(t, ne.max())
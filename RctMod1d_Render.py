@@ -0,0 +1,131 @@
+"""
+1D Plasma Render Module
+
+Render_1d contains:
+    headless rendering of profile snapshots
+        snapshots are put on a queue by the solver
+        a worker process renders them with the Agg backend
+        the solver does not wait for matplotlib
+    output: <path>/<prefix>_<frame>.png and <path>/<prefix>.gif,
+        path default out/, not under version control
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import numpy as np
+
+
+def render_worker(que, path, prefix, gif, fps):
+    """Render snapshots from the queue until None is received."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    frames = []
+    while True:
+        snap = que.get()
+        if snap is None:
+            break
+        itn, t, x, fields = snap
+        fig, axes = plt.subplots(1, len(fields), figsize=(4*len(fields), 3),
+                                 constrained_layout=True, squeeze=False)
+        for ax, (name, y) in zip(axes[0], fields.items()):
+            ax.plot(x, np.transpose(y), 'b-')
+            ax.set_xlabel('Position (m)')
+            ax.set_ylabel(name)
+        fig.suptitle(f'step = {itn}, t = {t:.3e} s')
+        fname = os.path.join(path, f'{prefix}_{len(frames):05d}.png')
+        fig.savefig(fname)
+        plt.close(fig)
+        frames.append(fname)
+    if gif and frames:
+        from PIL import Image
+        imgs = [Image.open(fname) for fname in frames]
+        try:
+            imgs[0].save(os.path.join(path, f'{prefix}.gif'), save_all=True,
+                         append_images=imgs[1:], duration=int(1000/fps),
+                         loop=0)
+        finally:
+            # one open file per frame otherwise
+            for img in imgs:
+                img.close()
+
+
+class Render_1d(object):
+    """Define the render stage."""
+
+    def __init__(self, path='out', prefix='frame', gif=True, fps=5,
+                 maxsize=16):
+        """
+        Start the render worker.
+
+        path: directory of the output frames, not under version control
+        prefix: file name prefix of frames and gif
+        gif: assemble the frames into an animated gif on close
+        fps: frames per second of the gif
+        maxsize: max number of snapshots waiting in the queue,
+                 snapshots are dropped when it is full
+        """
+        os.makedirs(path, exist_ok=True)
+        ctx = mp.get_context('spawn')
+        self.que = ctx.Queue(maxsize)
+        self.proc = ctx.Process(target=render_worker,
+                                args=(self.que, path, prefix, gif, fps),
+                                daemon=True)
+        self.proc.start()
+        self.nsub, self.ndrop = 0, 0
+
+    def __str__(self):
+        """Print render stage information."""
+        res = 'Render_1d:'
+        res += f'\nsubmitted = {self.nsub}, dropped = {self.ndrop}'
+        return res
+
+    def submit(self, itn, t, x, block=False, **fields):
+        """
+        Queue a snapshot for rendering.
+
+        itn: step number
+        t: s, time
+        x: m, position
+        block: wait for room in the queue instead of dropping
+        fields: name=array, one subplot each, copied before queuing
+        """
+        snap = (itn, t, np.array(x),
+                {name: np.array(y) for name, y in fields.items()})
+        try:
+            self.que.put(snap, block=block)
+            self.nsub += 1
+        except queue.Full:
+            self.ndrop += 1
+
+    def close(self):
+        """Render the remaining snapshots and write the gif."""
+        self.que.put(None)
+        self.proc.join()
+
+
+if __name__ == '__main__':
+    """Test Render_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    ren = Render_1d(prefix='ne_evolution')
+    dt = 1e-6
+    niter = 3000
+    for itn in range(niter):
+        txp1d.calc_ambi(pla1d)
+        pla1d.den_evolve(dt, txp1d, src1d)
+        pla1d.bndy_plasma()
+        pla1d.limit_plasma()
+        if not (itn+1) % (niter/10):
+            ren.submit(itn+1, dt*(itn+1), mesh1d.x, block=True,
+                       ne=pla1d.ne, ni=pla1d.ni)
+    ren.close()
+    print(ren)
@@ -0,0 +1,196 @@
+"""
+1D Plasma Simulation Driver Module
+
+Sim_1d contains:
+    one loop over macro steps for all coupled modules
+    modules registered with their own step and coupling order
+        faster modules are subcycled inside a macro step
+        slower modules run every N macro steps with the summed dt
+        modules with deps are skipped while their Plasma_1d inputs
+            are unchanged, see Plasma_1d.vers
+    call counts and wall time per module
+    build_sim: the standard chain
+        power -> transport -> reaction -> density -> eon energy
+    Input: Plasma_1d and update functions of the modules
+    Output: advanced modules, self.t
+"""
+
+from Constants import KB_EV
+
+import time
+import numpy as np
+
+
+class Sim_1d(object):
+    """Define the multirate simulation driver."""
+
+    def __init__(self, pla, dt):
+        """
+        Init the driver.
+
+        pla: Plasma_1d object, for the change detection of deps
+        dt: s, macro step
+        """
+        self.pla, self.dt = pla, dt
+        self.t, self.itn = 0.0, 0
+        self.t_sub = 0.0  # s, start of the running (sub)step
+        self.mods = []
+
+    def __str__(self):
+        """Print driver and module statistics."""
+        res = 'Sim_1d:'
+        res += f'\nt = {self.t} s, dt = {self.dt} s, steps = {self.itn}'
+        for mod in self.mods:
+            res += (f"\n{mod['name']:8s} every {mod['every']:4d} step(s), "
+                    f"{mod['nsub']:4d} substep(s), "
+                    f"calls = {mod['ncall']}, skipped = {mod['nskip']}, "
+                    f"time = {mod['time']:.3e} s")
+        return res
+
+    def add(self, name, func, dt=None, order=None, deps=None):
+        """
+        Register a module update.
+
+        func: func(dt), advances the module by dt,
+              from self.t_sub, e.g. for time-varying inputs
+        dt: s, step of the module
+            None - once per macro step
+            < macro step - subcycled, ceil(macro step/dt) substeps
+            > macro step - every round(dt/macro step) macro steps
+        order: coupling order, lower runs first, default order of add
+        deps: Plasma_1d variables the update depends on, it is skipped
+              while their versions are unchanged, () - run once
+        """
+        nsub, every = 1, 1
+        if dt is not None and dt < self.dt:
+            nsub = int(np.ceil(self.dt/dt*(1.0 - 1e-9)))
+        elif dt is not None:
+            every = max(int(round(dt/self.dt)), 1)
+        order = len(self.mods) if order is None else order
+        self.mods.append(dict(name=name, func=func, nsub=nsub, every=every,
+                              order=order, deps=deps, seen=None,
+                              ncall=0, nskip=0, time=0.0))
+        self.mods.sort(key=lambda mod: mod['order'])
+
+    def step(self):
+        """Advance all modules by one macro step."""
+        self.itn += 1
+        for mod in self.mods:
+            if self.itn % mod['every']:
+                continue
+            if mod['deps'] is not None:
+                vers = self.pla.vers(mod['deps'])
+                if vers == mod['seen']:
+                    mod['nskip'] += 1
+                    continue
+                mod['seen'] = vers
+            dt = self.dt*mod['every']/mod['nsub']
+            t0 = time.perf_counter()
+            for isub in range(mod['nsub']):
+                self.t_sub = self.t + isub*dt
+                mod['func'](dt)
+            mod['time'] += time.perf_counter() - t0
+            mod['ncall'] += 1
+        self.t += self.dt
+
+    def run(self, t_end, callback=None):
+        """
+        Run up to t_end.
+
+        callback: func(sim), called after every macro step,
+                  the run stops when it returns True, e.g.
+                  lambda sim: conv.check(sim.t, sim.pla), see Conv_1d
+        """
+        while self.t < t_end - 1e-9*self.dt:
+            self.step()
+            if callback is not None and callback(self):
+                break
+
+
+def build_sim(pla, txp, src, een, pwr, dt_den, dt_Te, dt_pwr=None,
+              pwr_in=1.0, theta=0.0, chem=False, couple=False):
+    """
+    Build the driver of the standard coupled model.
+
+    dt_den: s, macro step, the density step
+    dt_Te: s, eon energy step, subcycled if smaller than dt_den
+    dt_pwr: s, power deposition step, None - once (steady power)
+            else the power is updated every dt_pwr at the start of
+            the Te substeps, e.g. dt_Te for cycle-resolved RF power,
+            see RFPower_1d
+    pwr_in: W/m^3, see Power_1d.calc_pwr_in,
+            or func(t) of a time-varying power, e.g. pulsing,
+            then dt_pwr is needed
+    theta: implicitness of density and energy, see den_evolve
+    chem: integrate the sources by React_1d.chem_step (operator split)
+    couple: copy Te from Eergy_1d to Plasma_1d after the energy steps
+    output: Sim_1d object
+    """
+    sim = Sim_1d(pla, dt_den)
+
+    def power(t):
+        pwr_t = pwr_in(t) if callable(pwr_in) else pwr_in
+        pwr.calc_pwr_in(pla, pwr_t, t=t)
+    if dt_pwr is None:
+        sim.add('pwr', lambda dt: power(sim.t), deps=())
+    sim.add('transp', lambda dt: txp.calc_flux(pla))
+    chem = chem and bool(src.rcts)
+    if src.rcts and not chem:
+        sim.add('react', lambda dt: src.calc_src(pla))
+
+    def den(dt):
+        pla.den_evolve(dt, txp, None if chem else src, theta=theta)
+        pla.bndy_plasma()
+        pla.limit_plasma()
+    sim.add('den', den)
+    if chem:
+        sim.add('chem', lambda dt: src.chem_step(dt, pla))
+
+    def ergy(dt):
+        # eon energy follows the new ne at constant Te
+        np.multiply(pla.ne, een.Te, out=een.ergy_e)
+        een.ergy_e *= 1.5*KB_EV
+    sim.add('ergy', ergy)
+
+    # time-varying power, updated inside the Te substeps
+    t_pwr = [-np.inf]
+
+    def Te(dt):
+        if dt_pwr is not None and sim.t_sub >= t_pwr[0] - 1e-9*dt:
+            power(sim.t_sub)
+            t_pwr[0] = sim.t_sub + dt_pwr
+        een.calc_th_cond_coeff(pla)
+        een.calc_th_flux(pla, txp)
+        een.calc_Te(dt, pla, pwr, theta=theta)
+        een.bndy_Te()
+    sim.add('Te', Te, dt=dt_Te)
+    if couple:
+        def couple_Te(dt):
+            pla.Te[...] = een.Te
+            pla.touch('Te')
+        sim.add('couple', couple_Te)
+    return sim
+
+
+if __name__ == '__main__':
+    """Test Sim_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Eergy import Eergy_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    een1d = Eergy_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    # density at 1 us, eon energy subcycled at 0.25 us
+    sim = build_sim(pla1d, txp1d, src1d, een1d, pwr1d,
+                    dt_den=1e-6, dt_Te=3e-7)
+    sim.run(3e-3)
+    print(sim)
+    print('ne max =', pla1d.ne.max(), ', Te max =', een1d.Te.max())
+    een1d.plot_Te(pla1d)
@@ -0,0 +1,217 @@
+"""
+1D Plasma Steady State Module
+
+Steady_1d contains:
+    direct solve of the steady state, dy/dt = F(y) = 0
+        density: F = -dFlux/dx + Se, y = ne, ni
+        eon energy: F = -dQe + Power_in - loss, y = Te
+    Newton iteration with a finite-difference tridiagonal Jacobian
+        3-color perturbation, 3 evaluations of F per variable
+    pseudo-transient continuation (PTC) as fallback
+        (I/dtau - J) dy = F, dtau grows with the residual decrease
+    Input: Plasma_1d, Transp_1d, React_1d, Eergy_1d, Power_1d
+    Output: converged ne, ni in Plasma_1d and Te in Eergy_1d
+"""
+
+from Constants import KB_EV
+from RctMod1d_Mesh import solve_tridiag
+
+import logging
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class Steady_1d(object):
+    """Define the steady state solver."""
+
+    def __init__(self, tol=1e-8, maxiter=50, dtau_den=1e-6, dtau_Te=1e-7,
+                 dtau_max=1e3):
+        """
+        Init the steady state solver.
+
+        tol: convergence tolerance on max|dy|/max|y|
+        maxiter: max number of Newton/PTC iterations
+        dtau_den, dtau_Te: s, initial pseudo time step of PTC
+        dtau_max: s, PTC switches back to Newton above this dtau
+        """
+        self.tol = tol
+        self.maxiter = maxiter
+        self.dtau_den, self.dtau_Te = dtau_den, dtau_Te
+        self.dtau_max = dtau_max
+        self.hist = []  # (var, iteration, |dy|/|y|, dtau)
+
+    def __str__(self):
+        """Print steady state solver."""
+        res = 'Steady_1d:'
+        res += f'\ntol = {self.tol}'
+        res += f'\niterations = {len(self.hist)}'
+        return res
+
+    def calc_jac(self, func, y, f0):
+        """
+        Calc the tridiagonal Jacobian dF/dy by finite difference.
+
+        Nodes i, i+3, i+6, ... do not share a stencil,
+        so they are perturbed together.
+        y: array (nvar, nx), F is assumed local in each var,
+           which excludes a field solve (DriftDiff_1d), see solve_den
+        output: lower, diag, upper of shape (nvar, nx)
+        """
+        nvar, nx = y.shape
+        lower, diag, upper = [np.zeros_like(y) for _ in range(3)]
+        eps = np.sqrt(np.finfo(float).eps)*np.maximum(np.abs(y),
+                                                      np.max(np.abs(y))*1e-6)
+        for iv in range(nvar):
+            for ic in range(3):
+                yp = y.copy()
+                yp[iv, ic::3] += eps[iv, ic::3]
+                df = (func(yp)[iv] - f0[iv])
+                # column j perturbs rows j-1, j, j+1
+                jdx = np.arange(ic, nx, 3)
+                diag[iv, jdx] = df[jdx]/eps[iv, jdx]
+                jm = jdx[jdx > 0]
+                upper[iv, jm-1] = df[jm-1]/eps[iv, jm]
+                jp = jdx[jdx < nx-1]
+                lower[iv, jp+1] = df[jp+1]/eps[iv, jp]
+        return lower, diag, upper
+
+    def newton(self, name, func, y, dtau0):
+        """
+        Solve F(y) = 0 by Newton with PTC fallback.
+
+        func: F(y), boundary rows of F must be (y_bndy - y)
+        y: array (nvar, nx), initial guess, must stay positive
+        dtau0: s, initial PTC pseudo time step
+        output: converged y
+        """
+        dtau = np.inf  # pure Newton
+        f0 = func(y)
+        for itn in range(self.maxiter):
+            lower, diag, upper = self.calc_jac(func, y, f0)
+            dy = solve_tridiag(-lower, 1.0/dtau - diag, -upper, f0)
+            ynew = y + dy
+            fnew = func(ynew) if np.all(ynew > 0.0) else None
+            res0 = np.max(np.abs(f0[:, 1:-1]))
+            res1 = np.inf if fnew is None else np.max(np.abs(fnew[:, 1:-1]))
+            if not np.isfinite(res1) or (np.isinf(dtau) and res1 > res0):
+                # Newton step failed, fall back to (or shorten) PTC
+                dtau = dtau0 if np.isinf(dtau) else dtau*0.1
+                log.info('%s: iteration %d rejected, dtau = %.3e s',
+                         name, itn, dtau)
+                continue
+            err = np.max(np.abs(dy))/np.max(np.abs(ynew))
+            self.hist.append((name, itn, err, dtau))
+            y, f0 = ynew, fnew
+            if np.isinf(dtau) and err < self.tol:
+                return y
+            if not np.isinf(dtau):
+                # switched evolution relaxation
+                dtau *= res0/max(res1, np.finfo(float).tiny)
+                if dtau > self.dtau_max:
+                    dtau = np.inf
+        log.warning('%s: not converged in %d iterations', name, self.maxiter)
+        return y
+
+    def solve_den(self, pla, txp, src):
+        """
+        Solve the steady ne, ni.
+
+        With DriftDiff_1d, Poisson couples ne and ni over the whole
+        mesh, calc_jac does not hold and ValueError is raised,
+        use time stepping instead, see Step_1d.
+        """
+        if txp.field:
+            raise ValueError(f'{type(txp).__name__} solves the E-field, '
+                             f'the tridiagonal Jacobian of Steady_1d does '
+                             f'not hold, use Step_1d')
+        pla.bndy_plasma()
+        pla.limit_plasma()
+        yb = np.array([pla.ne, pla.ni])
+
+        def func(y):
+            pla.ne[...], pla.ni[...] = y[0], y[1]
+            pla.touch('ne', 'ni')
+            txp.calc_flux(pla)
+            f = np.array([-txp.dfluxe + src.se, -txp.dfluxi + src.si])
+            f[:, 0], f[:, -1] = yb[:, 0] - y[:, 0], yb[:, -1] - y[:, -1]
+            return f
+
+        y = self.newton('den', func, yb.copy(), self.dtau_den)
+        func(y)
+
+    def solve_Te(self, pla, txp, een, pwr):
+        """Solve the steady Te."""
+        een.bndy_Te()
+        yb = np.array([een.Te])
+        c = 1.5*KB_EV*pla.ne
+
+        def func(y):
+            een.Te[...] = y[0]
+            een.ergy_e[...] = c*y[0]
+            een.calc_th_cond_coeff(pla)
+            een.calc_th_flux(pla, txp)
+            f = np.array([-een.dQe + pwr.input - een.loss])
+            f[:, 0], f[:, -1] = yb[:, 0] - y[:, 0], yb[:, -1] - y[:, -1]
+            return f
+
+        y = self.newton('Te', func, yb.copy(), self.dtau_Te)
+        func(y)
+
+    def solve(self, pla, txp, src, een=None, pwr=None, couple=False,
+              nouter=20):
+        """
+        Solve the steady ne, ni and then Te.
+
+        couple: copy Te from Eergy_1d to Plasma_1d and repeat,
+                until Te changes less than tol
+        nouter: max number of coupling iterations
+        """
+        for itn in range(nouter):
+            self.solve_den(pla, txp, src)
+            if een is None:
+                return
+            self.solve_Te(pla, txp, een, pwr)
+            if not couple:
+                return
+            err = np.max(np.abs(een.Te - pla.Te))/np.max(een.Te)
+            pla.Te[...] = een.Te
+            pla.touch('Te')
+            if err < self.tol:
+                return
+
+
+def solve_steady(pla, txp, src, een=None, pwr=None, **kwargs):
+    """
+    Solve the steady state of density and Te directly.
+
+    Shortcut for Steady_1d(**kwargs).solve(pla, txp, src, een, pwr).
+    output: Steady_1d object, with the iteration history
+    """
+    couple = kwargs.pop('couple', False)
+    std = Steady_1d(**kwargs)
+    std.solve(pla, txp, src, een, pwr, couple=couple)
+    return std
+
+
+if __name__ == '__main__':
+    """Test Steady_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Eergy import Eergy_1d
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    een1d = Eergy_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    pwr1d.calc_pwr_in(pla1d)
+    std = solve_steady(pla1d, txp1d, src1d, een1d, pwr1d)
+    print(std)
+    for itn in std.hist:
+        print(itn)
+    een1d.plot_Te(pla1d)
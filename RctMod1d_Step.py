@@ -0,0 +1,235 @@
+"""
+1D Plasma Time Step Module
+
+Step_1d contains:
+    explicit stability limit from the diffusion coeffs
+        density: dt < dx^2/(2*D), D = Dne,i from Transp_1d
+        energy: dt < dx^2*(3/2*ne*k)/(2*ke), ke = th_cond_e from Eergy_1d
+    with a field (DriftDiff_1d), explicit at any theta
+        drift: dt < dx/|Mu*E|
+        dielectric relaxation: dt < eps0/(e*(Mue*ne + Mui*ni))
+    embedded error estimate (Euler vs. Heun)
+        err = dt/2 * |f(y(t+dt)) - f(y(t))|
+    step size control, dt grows or shrinks with err
+        a step at dt_min is accepted whatever err, with a warning
+    Input: Plasma_1d, Transp_1d, Eergy_1d, Power_1d, React_1d
+    Output: accepted step, dt
+"""
+
+from Constants import KB_EV, UNIT_CHARGE, EPS0
+
+import logging
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class Step_1d(object):
+    """Define the adaptive time step controller."""
+
+    def __init__(self, dt=1e-6, dt_min=1e-12, dt_max=1e-2, cfl=0.9,
+                 rtol=1e-3, atol=1e-6, safety=0.9,
+                 fac_min=0.2, fac_max=5.0):
+        """
+        Init the step controller.
+
+        dt: s, initial time step
+        dt_min, dt_max: s, bounds of time step
+        cfl: fraction of the explicit stability limit to use
+        rtol: relative tolerance of the local error
+        atol: absolute tolerance, as a fraction of max(|y|)
+        safety: safety factor on the new dt
+        fac_min, fac_max: bounds of dt change per step
+        """
+        self.dt = dt
+        self.dt_min, self.dt_max = dt_min, dt_max
+        self.cfl = cfl
+        self.rtol, self.atol = rtol, atol
+        self.safety = safety
+        self.fac_min, self.fac_max = fac_min, fac_max
+        self.t = 0.0  # time of the accepted solution
+        self.nacc, self.nrej, self.nforce = 0, 0, 0
+        self.rej = []  # rejected steps, (t, dt, err)
+
+    def __str__(self):
+        """Print step controller."""
+        res = 'Step_1d:'
+        res += f'\nt = {self.t} s'
+        res += f'\ndt = {self.dt} s'
+        res += f'\naccepted = {self.nacc}, rejected = {self.nrej}'
+        res += f', forced = {self.nforce}'
+        return res
+
+    def calc_dt_stab(self, geom, diff, theta=0.0):
+        """
+        Calc the stability limit of the theta-scheme for diffusion.
+
+        dt < 1/((1 - 2*theta)*D*|lap_0|), unconditional for theta >= 0.5
+        lap_0: diagonal of d2/dx2, 2/dx^2 on a uniform mesh,
+               so the local spacing sets the limit on a stretched mesh
+        diff: m^2/s, diffusivity D
+        Boundary nodes are fixed by b.c. and excluded.
+        """
+        if theta >= 0.5:
+            return np.inf
+        rate = np.max(diff[..., 1:-1]*np.abs(geom.lap_0[1:-1]))
+        return self.cfl/((1.0 - 2.0*theta)*rate)
+
+    def calc_dt_field(self, pla, txp):
+        """
+        Calc the stability limit of the drift and the field.
+
+        drift: dt < h/|Mu*E|, h: smaller spacing next to the node
+        dielectric relaxation: dt < eps0/sigma,
+            sigma = e*(Mue*ne + Mui*ni), the field lags the densities
+        Both are explicit at any theta, see Plasma_1d.den_evolve.
+        """
+        h = np.minimum(pla.geom.dx[:-1], pla.geom.dx[1:])
+        mu = np.maximum(txp.Mue, txp.Mui)[..., 1:-1]
+        rate = np.max(mu*np.abs(pla.ef[..., 1:-1])/h)
+        sigma = UNIT_CHARGE*(txp.Mue*pla.ne + txp.Mui*pla.ni)
+        rate = max(rate, np.max(sigma[..., 1:-1])/EPS0)
+        return self.cfl/rate if rate > 0.0 else np.inf
+
+    def calc_dt_den(self, pla, txp, theta=0.0):
+        """
+        Calc the stability limit of the density equation.
+
+        The drift and field limits are added for a field, see txp.field.
+        """
+        diff = np.maximum(txp.Dne, txp.Dni)
+        dt = self.calc_dt_stab(pla.geom, diff, theta)
+        if txp.field:
+            dt = min(dt, self.calc_dt_field(pla, txp))
+        return dt
+
+    def calc_dt_Te(self, pla, een, theta=0.0):
+        """
+        Calc the stability limit of the eon energy equation.
+
+        diffusivity = ke/(3/2*ne*k)
+        """
+        diff = np.divide(een.th_cond_e, 1.5*KB_EV*pla.ne)
+        return self.calc_dt_stab(pla.geom, diff, theta)
+
+    def calc_err(self, y, f0, f1, dt):
+        """
+        Calc the normalized local error of one step.
+
+        err = dt/2*|f1 - f0|/(atol*max|y| + rtol*|y|)
+        The step is acceptable if err <= 1.
+        """
+        scale = self.atol*np.max(np.abs(y)) + self.rtol*np.abs(y)
+        return np.max(0.5*dt*np.abs(f1 - f0)/scale)
+
+    def adapt(self, err, dt):
+        """
+        Update dt from the error of a step with size dt.
+
+        dt_new = dt*safety/sqrt(err), bounded by fac_min,max
+        A step at dt_min (or below, set by the stability limit) can not
+        be retried smaller, it is accepted with a warning,
+        FloatingPointError if err is not finite.
+        return: True if the step is accepted
+        """
+        if not np.isfinite(err):
+            fac = self.fac_min
+        elif err == 0.0:
+            fac = self.fac_max
+        else:
+            fac = min(self.fac_max, max(self.fac_min,
+                                        self.safety/np.sqrt(err)))
+        accept = err <= 1.0
+        if not accept and dt <= self.dt_min:
+            if not np.isfinite(err):
+                raise FloatingPointError(f'Step_1d: err = {err} at dt_min')
+            log.warning('step forced at dt_min: t = %.4e s, dt = %.4e s, '
+                        'err = %.3e', self.t, dt, err)
+            self.nforce += 1
+            accept = True
+        if accept:
+            self.t += dt
+            self.nacc += 1
+        else:
+            self.nrej += 1
+            self.rej.append((self.t, dt, err))
+            log.info('step rejected: t = %.4e s, dt = %.4e s, err = %.3e',
+                     self.t, dt, err)
+        self.dt = min(self.dt_max, max(self.dt_min, dt*fac))
+        return accept
+
+    def den_step(self, pla, txp, src, theta=0.0):
+        """
+        Try one density step, see Plasma_1d.den_evolve.
+
+        The state is restored if the step is rejected.
+        return: True if the step is accepted
+        """
+        ne0, ni0 = pla.ne.copy(), pla.ni.copy()
+        txp.calc_flux(pla)
+        f0e = -txp.dfluxe + src.se
+        f0i = -txp.dfluxi + src.si
+        dt = min(self.dt, self.calc_dt_den(pla, txp, theta))
+        pla.den_evolve(dt, txp, src, theta=theta)
+        pla.bndy_plasma()
+        pla.limit_plasma()
+        txp.calc_flux(pla)
+        err = max(self.calc_err(pla.ne, f0e, -txp.dfluxe + src.se, dt),
+                  self.calc_err(pla.ni, f0i, -txp.dfluxi + src.si, dt))
+        accept = self.adapt(err, dt)
+        if not accept:
+            pla.ne[...], pla.ni[...] = ne0, ni0
+            pla.touch('ne', 'ni')
+        return accept
+
+    def Te_step(self, pla, txp, een, pwr, theta=0.0):
+        """
+        Try one eon energy step, see Eergy_1d.calc_Te.
+
+        The state is restored if the step is rejected.
+        return: True if the step is accepted
+        """
+        ergy0, Te0 = een.ergy_e.copy(), een.Te.copy()
+        een.calc_th_cond_coeff(pla)
+        een.calc_th_flux(pla, txp)
+        f0 = -een.dQe + pwr.input - een.loss
+        dt = min(self.dt, self.calc_dt_Te(pla, een, theta))
+        een.calc_Te(dt, pla, pwr, theta=theta)
+        een.bndy_Te()
+        een.calc_th_cond_coeff(pla)
+        een.calc_th_flux(pla, txp)
+        err = self.calc_err(een.ergy_e, f0, -een.dQe + pwr.input - een.loss,
+                            dt)
+        accept = self.adapt(err, dt)
+        if not accept:
+            een.ergy_e[...], een.Te[...] = ergy0, Te0
+        return accept
+
+
+if __name__ == '__main__':
+    """Test Step_1d."""
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Eergy import Eergy_1d
+    logging.basicConfig(level=logging.INFO)
+    mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=51)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma()
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    # relax density up to 3 ms
+    step = Step_1d(dt=1e-6)
+    while step.t < 3e-3:
+        step.den_step(pla1d, txp1d, src1d)
+    print(step)
+    # relax Te up to 30 ms
+    een1d = Eergy_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    pwr1d.calc_pwr_in(pla1d)
+    step = Step_1d(dt=3e-7)
+    while step.t < 3e-2:
+        step.Te_step(pla1d, txp1d, een1d, pwr1d)
+    print(step)
@@ -0,0 +1,229 @@
+"""
+1D Plasma Parameter Sweep Module
+
+Sweep_1d contains:
+    grid of operating points, product of parameter lists
+        mesh: width, nx
+        plasma: ne, press, Te, Ti, Mi, see Plasma_1d.init_plasma
+        power: pwr, see Power_1d.calc_pwr_in
+        solver: steady, dt_den, niter_den, dt_Te, niter_Te,
+                tol - 1/s, stop the time loops early, see Conv_1d
+                warm - directory of the warm start cache, see Warm_1d
+    process pool, one case per task
+    result store, one npz shard per case + index.json
+        index.json: cases, and failed cases with their error
+    resume, cases with a shard in the store are skipped,
+        failed cases are retried
+"""
+
+import concurrent.futures as cf
+import itertools
+import json
+import logging
+import os
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# default parameters of a case
+CASE = dict(width=10e-2, nx=51,
+            ne=1e17, press=10, Te=1, Ti=0.1, Mi=40,
+            pwr=1.0,
+            steady=True, dt_den=1e-6, niter_den=3000,
+            dt_Te=3e-7, niter_Te=100000, tol=None, warm=None)
+# solver parameters, not part of the operating point of the warm start
+SOLVER = ('steady', 'dt_den', 'niter_den', 'dt_Te', 'niter_Te', 'tol',
+          'warm')
+
+
+def run_case(case):
+    """
+    Run one operating point.
+
+    case: dict of parameters, missing ones are taken from CASE
+    output: dict of profiles x, ne, ni, Te
+    """
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
+    from RctMod1d_Transp import Ambi_1d
+    from RctMod1d_React import React_1d
+    from RctMod1d_Eergy import Eergy_1d
+    from RctMod1d_Power import Power_1d
+    from RctMod1d_Steady import solve_steady
+    from RctMod1d_Conv import Conv_1d
+    from RctMod1d_Warm import Warm_1d
+    case = dict(CASE, **case)
+    mesh1d = Mesh_1d('Sweep_1d', case['width'], nx=case['nx'])
+    params = {name: val for name, val in case.items() if name not in SOLVER}
+    warm = prof = None
+    if case['warm']:
+        warm = Warm_1d(case['warm'])
+        prof = warm.get(params, mesh1d.x)
+    pla1d = Plasma_1d(mesh1d)
+    pla1d.init_plasma(ne=case['ne'], press=case['press'], Te=case['Te'],
+                      Ti=case['Ti'], Mi=case['Mi'])
+    txp1d = Ambi_1d(pla1d)
+    src1d = React_1d(pla1d)
+    pwr1d = Power_1d(pla1d)
+    pwr1d.calc_pwr_in(pla1d, case['pwr'])
+    if prof is not None:
+        warm.apply(prof, pla1d)
+    if case['steady']:
+        een1d = Eergy_1d(pla1d)
+        if prof is not None:
+            warm.apply(prof, pla1d, een1d)
+        solve_steady(pla1d, txp1d, src1d, een1d, pwr1d)
+    else:
+        conv = Conv_1d(case['tol'])
+        for itn in range(case['niter_den']):
+            txp1d.calc_flux(pla1d)
+            pla1d.den_evolve(case['dt_den'], txp1d, src1d)
+            pla1d.bndy_plasma()
+            pla1d.limit_plasma()
+            if case['tol'] and conv.check(case['dt_den']*(itn + 1),
+                                          pla1d):
+                break
+        een1d = Eergy_1d(pla1d)
+        if prof is not None:
+            warm.apply(prof, pla1d, een1d)
+        conv = Conv_1d(case['tol'])
+        for itn in range(case['niter_Te']):
+            een1d.calc_th_cond_coeff(pla1d)
+            een1d.calc_th_flux(pla1d, txp1d)
+            een1d.calc_Te(case['dt_Te'], pla1d, pwr1d)
+            een1d.bndy_Te()
+            if case['tol'] and conv.check(case['dt_Te']*(itn + 1),
+                                          pla1d, een=een1d):
+                break
+    if warm is not None:
+        warm.put(params, mesh1d.x, pla1d.ne, pla1d.ni, een1d.Te)
+    return dict(x=mesh1d.x, ne=pla1d.ne, ni=pla1d.ni, Te=een1d.Te)
+
+
+class Sweep_1d(object):
+    """Define the parameter sweep."""
+
+    def __init__(self, path, grid, nworker=None):
+        """
+        Init the sweep.
+
+        path: directory of the result store
+        grid: dict of parameter name: list of values,
+              all combinations are run
+        nworker: number of processes, default os.cpu_count()
+        """
+        unknown = set(grid) - set(CASE)
+        if unknown:
+            raise ValueError(f'unknown sweep parameters {sorted(unknown)}')
+        self.path = path
+        self.nworker = nworker or os.cpu_count()
+        names = sorted(grid)
+        self.cases = [dict(zip(names, vals)) for vals in
+                      itertools.product(*[grid[name] for name in names])]
+        self.init_store()
+
+    def __str__(self):
+        """Print sweep information."""
+        res = 'Sweep_1d:'
+        res += f'\npath = {self.path}'
+        res += f'\ncases = {len(self.cases)}, done = {len(self.done())}'
+        res += f', failed = {len(self.failed)}'
+        res += f'\nnworker = {self.nworker}'
+        return res
+
+    def init_store(self):
+        """Create the store, or check it matches the grid to resume."""
+        os.makedirs(self.path, exist_ok=True)
+        cases = json.loads(json.dumps(self.cases))
+        self.failed = {}  # icase -> error message
+        if os.path.exists(self.index()):
+            with open(self.index()) as f:
+                index = json.load(f)
+            if index['cases'] != cases:
+                raise ValueError(f'{self.index()} belongs to another sweep')
+            self.failed = {int(icase): err
+                           for icase, err in index['failed'].items()}
+        else:
+            self.save_index()
+
+    def index(self):
+        """Return the file name of the index."""
+        return os.path.join(self.path, 'index.json')
+
+    def save_index(self):
+        """Save cases and failures, written to a temp file first."""
+        tmp = self.index() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(dict(cases=self.cases, failed=self.failed), f,
+                      indent=1)
+        os.replace(tmp, self.index())
+
+    def shard(self, icase):
+        """Return the file name of one case."""
+        return os.path.join(self.path, f'case_{icase:06d}.npz')
+
+    def done(self):
+        """Return the indices of finished cases."""
+        return [icase for icase in range(len(self.cases))
+                if os.path.exists(self.shard(icase))]
+
+    def save(self, icase, res):
+        """Save one case, written to a temp file first to survive a crash."""
+        tmp = self.shard(icase)[:-4] + '.tmp.npz'
+        np.savez(tmp, **res)
+        os.replace(tmp, self.shard(icase))
+
+    def run(self, func=run_case):
+        """
+        Run all cases not yet in the store.
+
+        func: picklable func(case) returning a dict of arrays
+        A case raising an error is logged and recorded as failed
+        in index.json, the other cases go on, run again to retry.
+        output: dict of failed cases, icase -> error message
+        """
+        todo = sorted(set(range(len(self.cases))) - set(self.done()))
+        if not todo:
+            return self.failed
+        with cf.ProcessPoolExecutor(max_workers=self.nworker) as pool:
+            futs = {pool.submit(func, self.cases[icase]): icase
+                    for icase in todo}
+            for fut in cf.as_completed(futs):
+                icase = futs[fut]
+                try:
+                    self.save(icase, fut.result())
+                except Exception as exc:
+                    log.error('case %d failed: %s: %r', icase,
+                              self.cases[icase], exc)
+                    self.failed[icase] = repr(exc)
+                    self.save_index()
+                    continue
+                log.info('case %d done: %s', icase, self.cases[icase])
+                if self.failed.pop(icase, None) is not None:
+                    self.save_index()
+        return self.failed
+
+    def load(self):
+        """
+        Load the finished cases.
+
+        output: list of cases, dict of name: list of arrays
+        """
+        cases, res = [], {}
+        for icase in self.done():
+            cases.append(self.cases[icase])
+            with np.load(self.shard(icase)) as data:
+                for name in data.files:
+                    res.setdefault(name, []).append(data[name])
+        return cases, res
+
+
+if __name__ == '__main__':
+    """Test Sweep_1d."""
+    logging.basicConfig(level=logging.INFO)
+    swp = Sweep_1d('sweep_test', dict(press=[10, 20, 40], pwr=[0.5, 1.0]))
+    swp.run()
+    print(swp)
+    cases, res = swp.load()
+    for case, Te in zip(cases, res['Te']):
+        print(case, Te.max())
@@ -13,22 +13,68 @@ Transp_1d contains:
 """
 
 from Constants import KB_EV, EON_MASS, UNIT_CHARGE
+from RctMod1d_Field import Poisson_1d
 
 import numpy as np
-import matplotlib.pyplot as plt
-from copy import deepcopy
+
+
+def bernoulli(x):
+    """Bernoulli function B(x) = x/(exp(x) - 1), B(0) = 1."""
+    small = np.abs(x) < 1e-8
+    xs = np.where(small, 1.0, x)
+    with np.errstate(over='ignore'):
+        return np.where(small, 1.0 - 0.5*x, xs/np.expm1(xs))
 
 
 class Transp_1d(object):
     """Define the base tranport module/object."""
-    
-    def __init__(self, pla):
-        """Import geometry information."""
-        nx = pla.geom.nx
-        self.fluxe = np.zeros(nx)  # initial eon flux
-        self.fluxi = np.zeros(nx)  # initial ion flux
-        self.dfluxe = np.zeros(nx)  # initial eon flux
-        self.dfluxi = np.zeros(nx)  # initial ion flux
+
+    field = False  # True if pla.ef is solved, needed by by='EN'
+
+    def __init__(self, pla, table=None, by='mean'):
+        """
+        Import geometry information.
+
+        All arrays are preallocated with the shape of pla.ne
+        and updated in place.
+        table: Boltz_1d eon transport table, see RctMod1d_Boltz
+               None - De, Mue from the constant coll_em
+        by: 'mean' - table indexed by mean energy 3/2*Te
+            'EN' - table indexed by the local field |E|/N, needs pla.ef
+                   solved by the transport, i.e. DriftDiff_1d
+        """
+        if by not in ('mean', 'EN'):
+            raise ValueError(f"by must be 'mean' or 'EN', got {by}")
+        if by == 'EN' and not self.field:
+            raise ValueError(f"by='EN' needs the E-field, which "
+                             f"{type(self).__name__} does not solve, "
+                             f"use DriftDiff_1d")
+        self.table, self.by = table, by
+        self.fluxe = np.zeros_like(pla.ne)  # initial eon flux
+        self.fluxi = np.zeros_like(pla.ne)  # initial ion flux
+        self.dfluxe = np.zeros_like(pla.ne)  # initial eon flux
+        self.dfluxi = np.zeros_like(pla.ne)  # initial ion flux
+        self.De = np.zeros_like(pla.ne)  # eon diffusion coeff
+        self.Di = np.zeros_like(pla.ne)  # ion diffusion coeff
+        self.Mue = np.zeros_like(pla.ne)  # eon mobility
+        self.Mui = np.zeros_like(pla.ne)  # ion mobility
+        self.work = np.zeros_like(pla.ne)  # scratch
+        # versions of the Plasma_1d variables each result was built from
+        self.seen = dict()
+
+    def changed(self, key, pla, names):
+        """
+        Check if the inputs of a cached result have changed.
+
+        key: name of the cached result, e.g. 'coeff', 'Da'
+        names: Plasma_1d variables the result depends on
+        output: True if it must be recomputed
+        """
+        vers = (id(pla),) + pla.vers(names)
+        if self.seen.get(key) == vers:
+            return False
+        self.seen[key] = vers
+        return True
         
     def __str__(self):
         """Print Transport Module."""
@@ -42,58 +88,69 @@ class Transp_1d(object):
              calc uses pla.Te,i and pla.coll_em
         De,i: m^2/s, D = k*T/(m*coll_m)
         Mue,i: m^2/(V*s), Mu = q/(m*coll_m)
+        With a table, De, Mue = DN/N, muN/N instead.
+        Skipped if Te, Ti, coll_em,im, Mi and press are unchanged,
+        always done for a table indexed by E/N.
         """
-        # calc diff coeff: D = k*T/(m*coll_m)
-        self.De = np.divide(KB_EV*pla.Te, EON_MASS*pla.coll_em)  
-        self.Di = np.divide(KB_EV*pla.Ti, pla.Mi*pla.coll_im)  
-        # calc mobility: Mu = q/(m*coll_m)
-        self.Mue = UNIT_CHARGE/EON_MASS/pla.coll_em
-        self.Mui = UNIT_CHARGE/pla.Mi/pla.coll_im
+        if not self.changed('coeff', pla, ('Te', 'Ti', 'coll_em', 'coll_im',
+                                           'Mi', 'press')) and self.by != 'EN':
+            return
+        if self.table is not None:
+            self.calc_transp_table(pla)
+        else:
+            # calc diff coeff: D = k*T/(m*coll_m)
+            np.divide(pla.Te, pla.coll_em, out=self.De)
+            self.De *= KB_EV/EON_MASS
+            # calc mobility: Mu = q/(m*coll_m)
+            np.divide(UNIT_CHARGE/EON_MASS, pla.coll_em, out=self.Mue)
+        np.divide(pla.Ti, pla.coll_im, out=self.Di)
+        self.Di *= KB_EV
+        self.Di /= pla.Mi
+        np.divide(UNIT_CHARGE, pla.coll_im, out=self.Mui)
+        self.Mui /= pla.Mi
 
-    def plot_transp_coeff(self, pla):
+    def calc_transp_table(self, pla):
         """
-        Plot transp coeff.
-        
-        pla: Plasma_1d object
-            use pla.geom.x for plot
-        """
-        x = pla.geom.x
-        fig, axes = plt.subplots(1, 2, figsize=(8, 4),
-                                 constrained_layout=True)
-        # plot potential
-        ax = axes[0]
-        ax.plot(x, self.De, 'bo-')
-        ax.plot(x, self.Di, 'ro-')
-        ax.legend(['e Diffusion Coeff', 'Ion Diffusion Coeff'])
-        # plot E-field
-        ax = axes[1]
-        ax.plot(x, self.Mue, 'bo-')
-        ax.plot(x, self.Mui, 'ro-')
-        ax.legend(['e Mobility', 'Ion Mobility'])
-        plt.show()
-    
-    def plot_flux(self, pla):
+        Calc eon diffusion coefficient and mobility from the table.
+
+        De = DN/N, Mue = muN/N
+        indexed by 3/2*Te, or by |E|/N in local field mode
+        N: 1/m^3, gas density from the pressure, as in init_plasma
         """
-        Plot flux and dflux.
-        
-        pla: Plasma_1d object
-            use pla.geom.x for plot
-        """
-        x = pla.geom.x
-        fig, axes = plt.subplots(1, 2, figsize=(8, 4),
-                                 constrained_layout=True)
-        # plot potential
-        ax = axes[0]
-        ax.plot(x, self.fluxe, 'bo-')
-        ax.plot(x, self.fluxi, 'ro-')
-        ax.legend(['e flux', 'Ion flux'])
-        # plot E-field
-        ax = axes[1]
-        ax.plot(x, self.dfluxe, 'bo-')
-        ax.plot(x, self.dfluxi, 'ro-')
-        ax.legend(['e dflux', 'Ion dflux'])
-        # show fig
-        plt.show(fig)
+        N = pla.press*3.3e19
+        if self.by == 'EN':
+            np.abs(pla.ef, out=self.work)
+            self.work /= N
+        else:
+            np.multiply(pla.Te, 1.5, out=self.work)
+        self.table.calc('DN', self.work, self.by, out=self.De)
+        self.table.calc('muN', self.work, self.by, out=self.Mue)
+        self.De /= N
+        self.Mue /= N
+
+    def calc_dflux(self, pla, D, den, flux, dflux):
+        """
+        Calc diffusion flux and dflux in place.
+
+        flux = -D * dn/dx
+        dflux = -D * d2n/dx2
+        """
+        pla.geom.cnt_diff(den, out=flux)
+        flux *= D
+        np.negative(flux, out=flux)
+        pla.geom.cnt_diff_2nd(den, out=dflux)
+        dflux *= D
+        np.negative(dflux, out=dflux)
+
+    def plot_transp_coeff(self, pla):
+        """Plot transp coeff."""
+        from RctMod1d_Plot import plot_transp_coeff
+        plot_transp_coeff(self, pla)
+
+    def plot_flux(self, pla):
+        """Plot flux and dflux."""
+        from RctMod1d_Plot import plot_flux
+        plot_flux(self, pla)
 
 class Diff_1d(Transp_1d):
     """
@@ -107,13 +164,16 @@ class Diff_1d(Transp_1d):
         """Calc diffusion term: D * d2n/dx2 and diffusion flux D * dn/dx. """
         # Calc transp coeff first
         self.calc_transp_coeff(pla)
-        # Calc flux
-        self.fluxe = -self.De * pla.geom.cnt_diff(pla.ne)
-        self.fluxi = -self.Di * pla.geom.cnt_diff(pla.ni)
-        # Calc dflux
-        self.dfluxe = -self.De * pla.geom.cnt_diff_2nd(pla.ne)
-        self.dfluxi = -self.Di * pla.geom.cnt_diff_2nd(pla.ni)
-    
+        # D used in dflux, needed by the implicit density update
+        self.Dne, self.Dni = self.De, self.Di
+        # Calc flux and dflux
+        self.calc_dflux(pla, self.De, pla.ne, self.fluxe, self.dfluxe)
+        self.calc_dflux(pla, self.Di, pla.ni, self.fluxi, self.dfluxi)
+
+    def calc_flux(self, pla):
+        """Calc flux and dflux, common name for all transport modes."""
+        self.calc_diff(pla)
+
 class Ambi_1d(Transp_1d):
     """
     Calc the dflux for Ambipolar Diffusion Module.
@@ -146,23 +206,101 @@ class Ambi_1d(Transp_1d):
         # Calc transp coeff first
         self.calc_transp_coeff(pla)
         # Calc ambi coeff
-        self.Da = self.Di*(1.0 + np.divide(pla.Te, pla.Ti))
-        dni = pla.geom.cnt_diff(pla.ni)
-        self.Ea = np.divide(self.Di - self.De, self.Mui + self.Mue)
-        self.Ea *= np.divide(dni, pla.ni)
-        # Calc flux
-        self.fluxe = -self.Da * pla.geom.cnt_diff(pla.ne)
-        self.fluxi = -self.Da * pla.geom.cnt_diff(pla.ni)
-        # Calc dflux
-        self.dfluxe = -self.Da * pla.geom.cnt_diff_2nd(pla.ne)
-        self.dfluxi = -self.Da * pla.geom.cnt_diff_2nd(pla.ni)
+        if not hasattr(self, 'Da'):
+            self.Da = np.zeros_like(pla.ne)
+            self.Ea = np.zeros_like(pla.ne)
+        # Da and Ea are reused until their inputs change
+        coeff = ('Te', 'Ti', 'coll_em', 'coll_im', 'Mi', 'press')
+        if self.changed('Da', pla, coeff):
+            np.divide(pla.Te, pla.Ti, out=self.Da)
+            self.Da += 1.0
+            self.Da *= self.Di
+        # D used in dflux, needed by the implicit density update
+        self.Dne, self.Dni = self.Da, self.Da
+        # Ea = (Di - De)/(Mui + Mue) * dni/dx/ni
+        if self.changed('Ea', pla, coeff + ('ni',)):
+            pla.geom.cnt_diff(pla.ni, out=self.Ea)
+            self.Ea /= pla.ni
+            np.subtract(self.Di, self.De, out=self.work)
+            self.Ea *= self.work
+            np.add(self.Mui, self.Mue, out=self.work)
+            self.Ea /= self.work
+        # Calc flux and dflux
+        self.calc_dflux(pla, self.Da, pla.ne, self.fluxe, self.dfluxe)
+        self.calc_dflux(pla, self.Da, pla.ni, self.fluxi, self.dfluxi)
         # self.bndy_ambi()
 
+    def calc_flux(self, pla):
+        """Calc flux and dflux, common name for all transport modes."""
+        self.calc_ambi(pla)
+
+
+class DriftDiff_1d(Transp_1d):
+    """
+    Calc the dflux for Drift-Diffusion Module.
+
+    Flux = -D * dn/dx + z * Mu * E * n, z = -1 for eon, +1 for ion
+    E is solved from the Poisson equation, see RctMod1d_Field.
+    Scharfetter-Gummel flux between node i and i+1:
+    Flux = D/h * (B(-Pe)*n[i] - B(Pe)*n[i+1])
+    Pe = z*Mu*E*h/D, B(x) = x/(exp(x) - 1)
+    Output: Flux, dFlux/dx and E-field
+    """
+
+    field = True
+
+    def __init__(self, pla, phi_l=0.0, phi_r=0.0, **kwargs):
+        """
+        Import geometry information and factorize Poisson.
+
+        phi_l, phi_r: V, wall potentials, see Poisson_1d
+        kwargs: table, by, see Transp_1d
+        """
+        super().__init__(pla, **kwargs)
+        self.fld = Poisson_1d(pla, phi_l, phi_r)
+        self.h = pla.geom.dx  # node spacing
+        self.hc = 0.5*(self.h[1:] + self.h[:-1])  # width of interior cells
+
+    def calc_sg(self, pla, z, D, Mu, den, flux, dflux):
+        """
+        Calc Scharfetter-Gummel flux and dflux of one species.
+
+        z: charge number
+        Face values of D and Mu are averaged from the nodes.
+        """
+        Df = 0.5*(D[..., 1:] + D[..., :-1])
+        Muf = 0.5*(Mu[..., 1:] + Mu[..., :-1])
+        Ef = -np.diff(pla.pot)/self.h
+        Pe = z*Muf*Ef*self.h/Df
+        ff = Df/self.h*(bernoulli(-Pe)*den[..., :-1] -
+                        bernoulli(Pe)*den[..., 1:])
+        # flux on nodes, face values at the walls
+        flux[..., 1:-1] = 0.5*(ff[..., 1:] + ff[..., :-1])
+        flux[..., 0], flux[..., -1] = ff[..., 0], ff[..., -1]
+        dflux[..., 1:-1] = (ff[..., 1:] - ff[..., :-1])/self.hc
+        dflux[..., 0], dflux[..., -1] = dflux[..., 1], dflux[..., -2]
+
+    def calc_dd(self, pla):
+        """Calc potential, then drift-diffusion flux and dflux."""
+        # the field first, the local field mode needs it
+        self.fld.calc_pot(pla)
+        self.calc_transp_coeff(pla)
+        # D used in dflux, needed by the implicit density update
+        self.Dne, self.Dni = self.De, self.Di
+        self.calc_sg(pla, -1.0, self.De, self.Mue, pla.ne,
+                     self.fluxe, self.dfluxe)
+        self.calc_sg(pla, 1.0, self.Di, self.Mui, pla.ni,
+                     self.fluxi, self.dfluxi)
+
+    def calc_flux(self, pla):
+        """Calc flux and dflux, common name for all transport modes."""
+        self.calc_dd(pla)
+
 
 if __name__ == '__main__':
     """Test the tranp coeff calc."""
-    from Mesh import Mesh_1d
-    from Plasma1d import Plasma_1d
+    from RctMod1d_Mesh import Mesh_1d
+    from RctMod1d_Plasma import Plasma_1d
     mesh1d = Mesh_1d('Plasma_1d', 10e-2, nx=11)
     print(mesh1d)
     plasma1d = Plasma_1d(mesh1d)
@@ -174,3 +312,8 @@ if __name__ == '__main__':
     txp1d.calc_diff(plasma1d)
     txp1d.plot_flux(plasma1d)
     
+    # eon transport from the Boltzmann table
+    from RctMod1d_Boltz import get_table
+    txp1d = Diff_1d(plasma1d, table=get_table())
+    txp1d.calc_transp_coeff(plasma1d)
+    txp1d.plot_transp_coeff(plasma1d)
@@ -0,0 +1,234 @@
+"""
+1D Plasma Warm Start Module
+
+Warm_1d contains:
+    persistent cache of converged profiles x, ne, ni, Te
+        one warm_<hash>.npz per operating point, hash of the params
+            (mesh, pressure, power, ion mass, model options, ...)
+        written to a unique temp file and renamed, safe for parallel
+            workers, entries removed by another worker are skipped
+    LRU eviction, by number of entries and total size
+        the file mtime is the last use
+    lookup of a new operating point
+        exact match of the params
+        or inverse distance weighting of the nearest cached points,
+            distance in log(param) for positive numbers,
+            profiles remapped to the new mesh
+    Input: params dict, profiles of a converged run
+    Output: profiles to init Plasma_1d and Eergy_1d
+"""
+
+from Constants import KB_EV
+from RctMod1d_Mesh import remap
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+
+def calc_key(params):
+    """Calc the hash of an operating point, params: dict of scalars."""
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class Warm_1d(object):
+    """Define the warm start cache."""
+
+    def __init__(self, path, maxsize=256, maxbytes=None, match=('width',),
+                 ignore=('nx',), nnear=4):
+        """
+        Init the cache.
+
+        path: directory of the cache
+        maxsize: max number of entries
+        maxbytes: max total size of the entries, None - no limit
+        match: params that must be equal for the interpolation
+               (non-numeric params must always be equal)
+        ignore: params not used in the distance, e.g. nx,
+                profiles are remapped to the new mesh anyway
+        nnear: number of neighbours of the interpolation
+        """
+        self.path = path
+        self.maxsize, self.maxbytes = maxsize, maxbytes
+        self.match, self.ignore = match, ignore
+        self.nnear = nnear
+        self.params = {}  # file name -> params, read once
+        os.makedirs(path, exist_ok=True)
+
+    def __str__(self):
+        """Print warm start cache."""
+        res = 'Warm_1d:'
+        res += f'\npath = {self.path}'
+        res += f'\nentries = {len(self.list())}'
+        return res
+
+    def fname(self, key):
+        """Return the file name of an entry."""
+        return os.path.join(self.path, f'warm_{key}.npz')
+
+    def list(self):
+        """Return the entry files, least recently used first."""
+        entries = []
+        for name in os.listdir(self.path):
+            if name.startswith('warm_') and '.tmp' not in name:
+                fname = os.path.join(self.path, name)
+                try:
+                    entries.append((os.path.getmtime(fname), fname))
+                except FileNotFoundError:
+                    # evicted by another worker
+                    continue
+        return [fname for mtime, fname in sorted(entries)]
+
+    def read_params(self, fname):
+        """Return the params of an entry."""
+        if fname not in self.params:
+            with np.load(fname) as data:
+                self.params[fname] = json.loads(str(data['params']))
+        return self.params[fname]
+
+    def put(self, params, x, ne, ni, Te):
+        """Store the converged profiles of an operating point."""
+        fname = self.fname(calc_key(params))
+        # one temp file per writer, two workers may store the same point
+        fd, tmp = tempfile.mkstemp(suffix='.tmp.npz', prefix='warm_',
+                                   dir=self.path)
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, params=json.dumps(params, sort_keys=True,
+                                          default=str),
+                     x=x, ne=ne, ni=ni, Te=Te)
+        os.replace(tmp, fname)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries over the limits."""
+        fnames, sizes = [], []
+        for fname in self.list():
+            try:
+                sizes.append(os.path.getsize(fname))
+                fnames.append(fname)
+            except FileNotFoundError:
+                continue
+        while fnames and (len(fnames) > self.maxsize or
+                          (self.maxbytes and sum(sizes) > self.maxbytes)):
+            fname = fnames.pop(0)
+            sizes.pop(0)
+            try:
+                os.remove(fname)
+            except FileNotFoundError:
+                pass
+            self.params.pop(fname, None)
+
+    def load(self, fname, x):
+        """Load the profiles of an entry on nodes x, mark it used."""
+        now = time.time()
+        os.utime(fname, (now, now))
+        with np.load(fname) as data:
+            return {name: remap(data[name], data['x'], x)
+                    for name in ('ne', 'ni', 'Te')}
+
+    def calc_dist(self, params, other):
+        """
+        Calc the distance of two operating points.
+
+        output: distance, None if they can not be interpolated
+        """
+        if set(params) != set(other):
+            return None
+        dist = 0.0
+        for name, val in params.items():
+            ref = other[name]
+            num = all(isinstance(v, (int, float)) and not isinstance(v, bool)
+                      for v in (val, ref))
+            if name in self.match or not num:
+                if val != ref:
+                    return None
+            elif name not in self.ignore:
+                if val > 0 and ref > 0:
+                    dist += np.log(val/ref)**2
+                else:
+                    dist += (val - ref)**2
+        return np.sqrt(dist)
+
+    def get(self, params, x):
+        """
+        Find the profiles of an operating point.
+
+        x: nodes of the new mesh
+        output: dict of ne, ni, Te and 'exact' (bool), None if no entry
+        """
+        fname = self.fname(calc_key(params))
+        if os.path.exists(fname):
+            try:
+                return dict(self.load(fname, x), exact=True)
+            except FileNotFoundError:
+                pass
+        near = []
+        for fname in self.list():
+            try:
+                dist = self.calc_dist(params, self.read_params(fname))
+            except FileNotFoundError:
+                continue
+            if dist is not None:
+                near.append((dist, fname))
+        if not near:
+            return None
+        profs = []
+        for dist, fname in sorted(near):
+            try:
+                profs.append((dist, self.load(fname, x)))
+            except FileNotFoundError:
+                continue
+            if dist == 0.0 or len(profs) == self.nnear:
+                break
+        if not profs:
+            return None
+        if profs[-1][0] == 0.0:
+            # same point on another mesh
+            return dict(profs[-1][1], exact=False)
+        wgt = np.array([1.0/dist**2 for dist, prof in profs])
+        wgt /= wgt.sum()
+        res = dict(ne=0.0, ni=0.0, Te=0.0)
+        for w, (dist, prof) in zip(wgt, profs):
+            for name, val in prof.items():
+                res[name] = res[name] + w*val
+        res['exact'] = False
+        return res
+
+    def apply(self, prof, pla, een=None):
+        """
+        Init Plasma_1d ne, ni and Eergy_1d Te from found profiles.
+
+        pla.Te is a model parameter here and is kept.
+        """
+        pla.ne[...], pla.ni[...] = prof['ne'], prof['ni']
+        pla.touch('ne', 'ni')
+        if een is not None:
+            een.Te[...] = prof['Te']
+            np.multiply(pla.ne, een.Te, out=een.ergy_e)
+            een.ergy_e *= 1.5*KB_EV
+
+
+if __name__ == '__main__':
+    """Test Warm_1d."""
+    import tempfile
+    from RctMod1d_Sweep import run_case
+    with tempfile.TemporaryDirectory() as path:
+        warm = Warm_1d(path)
+        base = dict(steady=False, tol=1.0, warm=path)
+        for press in (5, 40, 20, 20, 10, 15):
+            nentry = len(warm.list())
+            t0 = time.perf_counter()
+            res = run_case(dict(base, press=press))
+            print(f'press = {press:3d} mTorr, '
+                  f"{'warm' if nentry else 'cold'} start: "
+                  f'{time.perf_counter() - t0:.2f} s, '
+                  f"Te max = {res['Te'].max():.4f}")
+        print(warm)
+        # LRU, keep the 3 last used
+        warm.maxsize = 3
+        warm.evict()
+        print(warm)
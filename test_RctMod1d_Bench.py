@@ -0,0 +1,9 @@
+"""Test the allocation budget of the coupled explicit step."""
+
+from RctMod1d_Bench import ALLOC_STEP, check_alloc
+
+
+def test_alloc():
+    """A step allocates less than ALLOC_STEP, whatever nx."""
+    for nx in (501, 100001):
+        assert check_alloc(nx) < ALLOC_STEP
@@ -0,0 +1,26 @@
+"""Test the batch mode of Plasma_1d."""
+
+import numpy as np
+
+from RctMod1d_Mesh import Mesh_1d
+from RctMod1d_Plasma import Plasma_1d
+from RctMod1d_Transp import Ambi_1d
+
+
+def run_ambi(**kwargs):
+    """Init a plasma, calc the ambipolar fluxes."""
+    pla1d = Plasma_1d(Mesh_1d('Plasma_1d', 10e-2, nx=11))
+    pla1d.init_plasma(**kwargs)
+    txp1d = Ambi_1d(pla1d)
+    txp1d.calc_ambi(pla1d)
+    return pla1d, txp1d
+
+
+def test_batch_Mi():
+    """A batch varying only the ion mass matches the single cases."""
+    pla1d, txp1d = run_ambi(Mi=[4, 40])
+    assert pla1d.ne.shape == (2, 11)
+    for icase, Mi in enumerate((4, 40)):
+        ref = run_ambi(Mi=Mi)[1]
+        np.testing.assert_allclose(txp1d.Di[icase], ref.Di)
+        np.testing.assert_allclose(txp1d.fluxi[icase], ref.fluxi)